@@ -0,0 +1,62 @@
+"""Benchmark for markdown-to-HTML report rendering.
+
+Renders a synthetic report with many sections, bullet-line paragraphs and
+numbered lists through ReportGenerator.generate_html_report. Requires a
+config.py (copy example_config.py). Run from the repository root:
+
+    python -m benchmarks.bench_html --sections 500 --repeat 5
+"""
+import argparse
+import json
+import sys
+import time
+
+from src.instrumentation import percentile
+from src.report_generator import ReportGenerator
+
+
+def synthetic_report(sections=500):
+    """Markdown shaped like an LLM-written report: a TOC, nested headers and unspaced lists."""
+    parts = ["# Synthetic Report\n\n## Table of Contents\n\n"
+             + "\n".join(f"{i}. Section {i}" for i in range(1, 11)) + "\n"]
+    for i in range(1, sections + 1):
+        level = "##" if i % 5 == 1 else "###"
+        parts.append(
+            f"{level} Section {i}\n\n"
+            f"Paragraph about section {i} with **bold** and *italic* text and a [link](https://example.com/{i}).\n\n"
+            f"Key points:\n- First point of {i}\n- Second point of {i}\n- Third point of {i}\n\n"
+            f"1. Step one\n2. Step two\n\n"
+            f"Closing remarks for section {i}.\n"
+        )
+    return "\n".join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HTML report rendering.")
+    parser.add_argument("--sections", type=int, default=500, help="sections in the synthetic report")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed renders")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    report_generator = ReportGenerator(None)
+    markdown_text = synthetic_report(args.sections)
+
+    durations = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        html = report_generator.generate_html_report(markdown_text, "Synthetic Report")
+        durations.append(time.perf_counter() - start)
+    durations.sort()
+
+    result = {
+        "sections": args.sections,
+        "markdown_chars": len(markdown_text),
+        "html_chars": len(html),
+        "p50_seconds": round(percentile(durations, 50), 4),
+        "max_seconds": round(durations[-1], 4),
+    }
+    print(json.dumps(result, indent=2))
+    return result
+
+
+if __name__ == "__main__":
+    main()
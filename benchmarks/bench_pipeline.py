@@ -0,0 +1,189 @@
+"""Offline throughput/latency benchmark for the research pipeline.
+
+Runs Researcher.general_purpose_research, the batch path, the async path and
+the Message Batches path against a local FakeWebServer and a FakeAnthropic client, so results can be
+compared on any Linux box without network access. With --mode all, each
+mode runs in its own process, so peak_rss_mb is that mode's own peak.
+Requires a config.py (copy example_config.py). Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --topics 8 --page-latency 0.05 --llm-delay 0.2
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from config import CONFIG
+from benchmarks.fake_services import FakeWebServer, fake_report_responder
+from src.async_researcher import AsyncResearcher
+from src.batch import run_batch
+from src.fake_anthropic import FakeAnthropic, FakeAsyncAnthropic
+from src.message_batches import MessageBatchRunner, run_message_batches
+from src.instrumentation import Tracer, percentile
+from src.researcher import Researcher
+
+
+class _TracingResearcher:
+    """Hands every topic its own Tracer and keeps them for aggregation."""
+
+    def __init__(self, researcher):
+        self.researcher = researcher
+        self.tracers = []
+
+    def general_purpose_research(self, topic, tracer=None, run_id=None):
+        tracer = tracer or Tracer(run=topic)
+        self.tracers.append(tracer)
+        return self.researcher.general_purpose_research(topic, tracer=tracer, run_id=run_id)
+
+
+def _fake_client(args, client_class=FakeAnthropic):
+    return client_class(delay=args.llm_delay, output_tokens=args.output_tokens, responder=fake_report_responder)
+
+
+def _summarize(mode, tracers, elapsed, num_topics):
+    durations = {}
+    for tracer in tracers:
+        for span in tracer.spans:
+            durations.setdefault(span["name"], []).append(span["duration"])
+    pages = len(durations.get("fetch", []))
+    counters = {}
+    for tracer in tracers:
+        for name, value in tracer.counters.items():
+            counters[name] = counters.get(name, 0) + value
+    return {
+        "mode": mode,
+        "topics": num_topics,
+        "elapsed_seconds": round(elapsed, 3),
+        "pages_per_second": round(pages / elapsed, 2) if elapsed else 0.0,
+        "topics_per_minute": round(num_topics / elapsed * 60, 2) if elapsed else 0.0,
+        "stages": {
+            name: {"count": len(values), "p50": percentile(sorted(values), 50), "p95": percentile(sorted(values), 95)}
+            for name, values in sorted(durations.items())
+        },
+        "fetches_saved": int(counters.get("dedup_fetches_saved", 0)),
+        "prompt_tokens_saved": int(counters.get("dedup_tokens_saved", 0) + counters.get("context_tokens_saved", 0)),
+        # Peak of the whole process, which runs only this mode
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def bench_sync(topics, args):
+    researcher = _TracingResearcher(Researcher(
+        num_results=args.results, use_cache=args.cache, use_llm_cache=args.cache, use_corpus=args.cache,
+        ai_client=_fake_client(args)))
+    start = time.perf_counter()
+    for topic in topics:
+        researcher.general_purpose_research(topic)
+    return _summarize("sync", researcher.tracers, time.perf_counter() - start, len(topics))
+
+
+def bench_batch(topics, args):
+    researcher = _TracingResearcher(Researcher(
+        num_results=args.results, use_cache=args.cache, use_llm_cache=args.cache, use_corpus=args.cache,
+        ai_client=_fake_client(args)))
+    start = time.perf_counter()
+    run_batch(topics, researcher, io.StringIO(), workers=args.workers)
+    return _summarize("batch", researcher.tracers, time.perf_counter() - start, len(topics))
+
+
+def bench_message_batches(topics, args):
+    # A fake batch takes as long as one request would; the runner polls it every 50ms
+    client = FakeAnthropic(output_tokens=args.output_tokens, responder=fake_report_responder, batch_delay=args.llm_delay)
+    researcher = Researcher(num_results=args.results, use_cache=args.cache, use_llm_cache=args.cache,
+                            use_corpus=args.cache, ai_client=client)
+    runner = MessageBatchRunner(researcher.ai_model, poll_interval=0.05, max_poll_interval=0.05)
+    tracer = Tracer(run="message_batches")
+    start = time.perf_counter()
+    run_message_batches(topics, researcher, io.StringIO(), workers=args.workers, runner=runner, tracer=tracer)
+    return _summarize("message_batches", [tracer], time.perf_counter() - start, len(topics))
+
+
+def bench_async(topics, args):
+    tracers = [Tracer(run=topic) for topic in topics]
+
+    async def run():
+        async with AsyncResearcher(
+                num_results=args.results, max_topics=args.workers, use_cache=args.cache,
+                use_llm_cache=args.cache, use_corpus=args.cache,
+                ai_client=_fake_client(args, FakeAsyncAnthropic)) as researcher:
+            await asyncio.gather(*(
+                researcher.general_purpose_research(topic, tracer=tracer) for topic, tracer in zip(topics, tracers)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    return _summarize("async", tracers, time.perf_counter() - start, len(topics))
+
+
+MODES = {"sync": bench_sync, "batch": bench_batch, "async": bench_async, "message_batches": bench_message_batches}
+
+
+def _run_mode_process(mode, argv):
+    """Benchmark one mode in a fresh interpreter so its memory peak is its own."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pipeline", *argv, "--mode", mode],
+        stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(completed.stdout)[0]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline against local fakes.")
+    parser.add_argument("--mode", choices=["all", *MODES], default="all")
+    parser.add_argument("--topics", type=int, default=4, help="number of topics to research")
+    parser.add_argument("--results", type=int, default=CONFIG["NUM_SEARCH_RESULTS"], help="search results per query")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent topics in batch/async modes")
+    parser.add_argument("--page-latency", type=float, default=0.05, help="seconds each content page takes")
+    parser.add_argument("--page-bytes", type=int, default=20000, help="approximate size of each content page")
+    parser.add_argument("--llm-delay", type=float, default=0.1, help="seconds each fake LLM call takes")
+    parser.add_argument("--output-tokens", type=int, default=300, help="tokens in each fake LLM response")
+    parser.add_argument("--cache", action="store_true", help="leave the HTTP/LLM caches and the corpus enabled")
+    parser.add_argument("--pages", type=int, default=200, help="distinct content pages search results link to")
+    parser.add_argument("--tracking-links", action="store_true",
+                        help="link search results with per-query tracking parameters")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    if args.mode == "all":
+        results = [_run_mode_process(mode, argv) for mode in MODES]
+        print(json.dumps(results, indent=2))
+        return results
+
+    topics = [f"benchmark topic {i}" for i in range(args.topics)]
+
+    with FakeWebServer(page_latency=args.page_latency, page_bytes=args.page_bytes,
+                       results_per_query=args.results, num_pages=args.pages, tracking_links=args.tracking_links) as server, tempfile.TemporaryDirectory() as workdir:
+        # Keep every file the pipeline writes inside a scratch directory
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        CONFIG.update({
+            "SEARCH_URL": server.search_url,
+            # The fake server stands in for many hosts, so don't throttle it like one
+            "SCRAPER_PER_HOST_LIMIT": 64,
+            "DOMAIN_RATE": 0,
+            "ASYNC_FETCH_RATE": 0,
+            "ASYNC_LLM_RATE": 0,
+            "CACHE_DIR": os.path.join(workdir, "cache"),
+            "CONVERSATION_LOG_PATH": os.path.join(workdir, "debug", "conversation_log.jsonl"),
+            "TRACE_DIR": os.path.join(workdir, "debug"),
+            "RUNS_DIR": os.path.join(workdir, "runs"),
+            "STATE_DIR": os.path.join(workdir, "state"),
+        })
+        try:
+            results = [MODES[args.mode](topics, args)]
+        finally:
+            os.chdir(cwd)
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+_VOCABULARY = (
+    "research market policy growth data report analysis energy climate bank rate inflation study "
+    "survey trend region sector model risk capital labor trade price index supply demand forecast "
+    "quarter annual network system program agency council evidence sample outcome impact method"
+).split()
+
+
+class FakeWebServer:
+    """Local HTTP server standing in for Google search and the pages it links to.
+
+    /search?q=... returns a results page using Google's `yuRUbf` markup with
+    `results_per_query` links to /page/<n>. Which pages a query links to is
+    derived from a hash of the query, so related runs overlap like real ones.
+    With `tracking_links`, links carry a per-query utm_source parameter, so
+    the same page shows up under different URLs. /page/<n> sleeps
+    `page_latency` seconds and returns an article of roughly `page_bytes`
+    bytes inside <main>, with text distinct to each page.
+    """
+
+    def __init__(self, page_latency=0.05, page_bytes=20000, results_per_query=5, num_pages=200, host="127.0.0.1", port=0,
+                 tracking_links=False):
+        self.page_latency = page_latency
+        self.page_bytes = page_bytes
+        self.results_per_query = results_per_query
+        self.tracking_links = tracking_links
+        self.num_pages = num_pages
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def search_url(self):
+        """Template suitable for CONFIG["SEARCH_URL"]."""
+        return self.base_url + "/search?q={query}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def search_page(self, query):
+        digest = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        first = int(digest, 16) % self.num_pages
+        suffix = f"?utm_source={digest[:8]}" if self.tracking_links else ""
+        links = "".join(
+            f'<div class="g"><div class="yuRUbf"><a href="{self.base_url}/page/{(first + i) % self.num_pages}{suffix}">'
+            f'<h3>Result {i}</h3></a></div></div>'
+            for i in range(self.results_per_query)
+        )
+        return f"<html><head><title>{query} - Search</title></head><body><div id=\"search\">{links}</div></body></html>"
+
+    def content_page(self, number):
+        rng = random.Random(number)
+        paragraphs = []
+        size = 0
+        while size < self.page_bytes:
+            sentences = (" ".join(rng.choices(_VOCABULARY, k=12)).capitalize() + "." for _ in range(8))
+            paragraph = f"<p>Page {number}: {' '.join(sentences)}</p>"
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+        return (
+            f"<html><head><title>Fake article {number}</title><style>p {{ margin: 0 }}</style></head>"
+            f"<body><nav>Home | About</nav><main><h1>Article {number}</h1>{''.join(paragraphs)}</main>"
+            f"<footer>Footer text</footer></body></html>"
+        )
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    # Scrapers hang up mid-body once they have extracted enough of a page
+                    self.close_connection = True
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                parts = urlsplit(self.path)
+                if parts.path == "/search":
+                    body = server.search_page(parse_qs(parts.query).get("q", [""])[0])
+                elif parts.path.startswith("/page/"):
+                    time.sleep(server.page_latency)
+                    body = server.content_page(parts.path.rsplit("/", 1)[-1])
+                else:
+                    self.send_error(404)
+                    return
+
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def fake_report_responder(prompt, max_tokens):
+    """Deterministic LLM stand-in producing markdown shaped like real pipeline output."""
+    subject = " ".join(prompt.split()[:6])
+    if "generate 3 specific follow-up questions" in prompt or "generate 3 follow-up questions" in prompt:
+        return "\n".join(f"{i}. What specific evidence supports point {i} about {subject}?" for i in range(1, 4))
+    if "Analyze the following report for information gaps" in prompt:
+        return "\n".join(f"- Section {i}: needs concrete examples and dates" for i in range(1, 6))
+    sections = []
+    for i in range(1, 7):
+        sections.append(
+            f"## Section {i}\n\nDiscussion of {subject} with *emphasis* and detail.\n\n"
+            f"- Finding {i}.1\n- Finding {i}.2\n- Finding {i}.3\n"
+        )
+    return "# Report\n\n## Table of Contents\n\n1. Intro\n2. Findings\n\n" + "\n".join(sections)
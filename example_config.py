@@ -4,20 +4,100 @@ CONFIG = {
 
     # Scraper settings
     "NUM_SEARCH_RESULTS": 3,
+    "SEARCH_URL": "https://www.google.com/search?q={query}",
     "SELENIUM_TIMEOUT": 10,  # in seconds
+    "SCRAPER_MAX_WORKERS": 8,  # pages fetched concurrently
+    "SCRAPER_PER_HOST_LIMIT": 2,  # concurrent requests to a single host
+    "CONNECT_TIMEOUT": 5,  # in seconds
+    "READ_TIMEOUT": 15,  # in seconds
+    "MAX_PAGE_BYTES": 2 * 1024 * 1024,  # stop downloading a page after this many bytes
+    "MAX_CONTENT_CHARS": 5000,  # main-content text kept per page
+    "FOLLOWUP_CONCURRENCY": 3,  # follow-up questions searched at once
 
     # File paths
-    "DEBUG_DIR": "debug",
-    "REPORTS_DIR": "reports",
+    "RUNS_DIR": "runs",  # each run writes its report, trace and conversation log to RUNS_DIR/<run id>/
+    "DEBUG_OUTPUT": False,  # also keep scraped pages and follow-up questions in RUNS_DIR/<run id>/debug/
+    "CACHE_DIR": "cache",
+    "CONVERSATION_LOG_PATH": "debug/conversation_log.jsonl",  # for calls outside a run; runs use its file name. End in .gz to compress
+
+    # Conversation log settings
+    "CONVERSATION_LOG_FLUSH_EVERY": 20,  # buffered interactions before a write
+    "CONVERSATION_LOG_FLUSH_INTERVAL": 5.0,  # in seconds
+
+    # HTTP cache settings
+    "HTTP_CACHE_ENABLED": True,  # disable per run with --fresh
+    "HTTP_CACHE_TTL": 86400,  # in seconds
+    "HTTP_CACHE_MAX_BYTES": 512 * 1024 * 1024,  # compressed size, LRU-evicted
+
+    # LLM response cache settings
+    "LLM_CACHE_ENABLED": True,  # disable per run with --no-llm-cache
+    "LLM_CACHE_TTL": 7 * 86400,  # in seconds
+    "LLM_CACHE_MAX_BYTES": 256 * 1024 * 1024,  # compressed size, LRU-evicted
 
     # Report generator settings
     "AI_MODEL": "claude-3-haiku-20240307",
 
+    # Instrumentation settings
+    "TRACE_ENABLED": True,  # write a per-run JSON trace of stage timings
+    "TRACE_DIR": "debug",  # for traces not tied to one run
+    "TRACE_PROMETHEUS": False,  # also write a Prometheus text dump next to the trace
+
+    # Batch mode settings
+    "BATCH_WORKERS": 4,  # topics researched at once by main.py --batch
+
+    # Research service settings (main.py --serve)
+    "SERVICE_HOST": "127.0.0.1",
+    "SERVICE_PORT": 8765,
+    "SERVICE_WORKERS": 2,  # worker processes, each keeping a warm Researcher; one job at a time each
+    "SERVICE_QUEUE_SIZE": 16,  # jobs waiting for a worker before new ones are refused with 429
+    "SERVICE_MAX_FINISHED_JOBS": 1000,  # finished jobs whose status and events are kept
+
+    # Async pipeline settings
+    "ASYNC_MAX_TOPICS": 4,  # topics researched at once by AsyncResearcher
+    "ASYNC_MAX_CONNECTIONS": 32,  # shared HTTP connection pool size
+    "ASYNC_FETCH_RATE": 10,  # page/search requests per second, all topics (0 = unlimited)
+    "ASYNC_LLM_CONCURRENCY": 4,  # LLM calls in flight, all topics
+    "ASYNC_LLM_RATE": 1,  # LLM calls per second, all topics (0 = unlimited)
+
+    # Prompt context packing settings
+    "CONTEXT_PACKING": True,  # dedupe and rank scraped passages before prompting
+    "INITIAL_CONTEXT_TOKENS": 6000,  # scraped-content budget for the initial report prompt
+    "FOLLOWUP_CONTEXT_TOKENS": 6000,  # budget shared by all follow-up questions
+    "DEDUP_THRESHOLD": 0.8,  # estimated Jaccard similarity treated as duplicate
+    "CONTENT_DEDUP_DISTANCE": 3,  # max differing SimHash bits for two pages to be merged as near-duplicates
+
+    # Message Batches settings (main.py --batch FILE --llm-batch)
+    "LLM_BATCH_POLL_INTERVAL": 10,  # seconds before the first status poll of a batch
+    "LLM_BATCH_MAX_POLL_INTERVAL": 120,  # poll interval cap as it backs off
+    "LLM_BATCH_TIMEOUT": 24 * 3600,  # seconds before an unfinished batch is cancelled
+    "LLM_BATCH_MAX_REQUESTS": 10000,  # requests per submitted batch
+
+    # Local research corpus settings
+    "CORPUS_ENABLED": True,  # keep every extracted page in CACHE_DIR/corpus.sqlite3 and search it before the web
+    "CORPUS_MAX_AGE": 7 * 86400,  # seconds before a corpus page is too stale to answer a query on its own
+    "CORPUS_MIN_COVERAGE": 0.6,  # fraction of query terms a corpus page must contain to count as a match
+
+    # Streaming and pipelining settings
+    "STREAM_REPORT": True,  # write the HTML report section by section while it is generated
+    "PIPELINE_OVERLAP": True,  # research each follow-up question as soon as its line is generated
+    "MERGE_GAP_ANALYSIS": False,  # ask for follow-up questions directly, skipping the gap analysis call
+
+    # Checkpointing
+    "CHECKPOINT_ENABLED": True,  # save each finished stage under STATE_DIR/<run id>/ so a failed run can be resumed
+    "STATE_DIR": "state",
+    "CHECKPOINT_KEEP_COMPLETED": False,  # keep the checkpoints of runs that finished
+
     # Logging
     "LOG_LEVEL": "INFO",
     "LOG_FORMAT": "%(asctime)s - %(levelname)s - %(message)s",
 
+    # HTTP session settings
+    "HTTP_POOL_SIZE": 32,  # keep-alive connections kept per host
+    "DOMAIN_RATE": 2,  # requests per second to any one host (0 = unlimited)
+    "DOMAIN_RATE_OVERRIDES": {"www.google.com": 0.5},  # per-host requests per second
+    "MAX_BACKOFF": 30,  # longest wait between retries, in seconds
+
     # Other settings
     "MAX_RETRIES": 3,
-    "RETRY_DELAY": 2,  # in seconds
+    "RETRY_DELAY": 2,  # in seconds, base of the exponential backoff
 }
\ No newline at end of file
@@ -1,21 +1,68 @@
 import sys
+import argparse
 import logging
 from src.researcher import Researcher
+from src.batch import read_topics, run_batch
+from src.message_batches import run_message_batches
+from src.service import serve
 from config import CONFIG
 
 # Set up logging
 logging.basicConfig(level=CONFIG["LOG_LEVEL"], format=CONFIG["LOG_FORMAT"])
 logger = logging.getLogger(__name__)
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Research a topic and generate an HTML report.")
+    parser.add_argument("topic", nargs="*", help="research topic")
+    parser.add_argument("--fresh", action="store_true", help="bypass cached pages and the local corpus and fetch everything again")
+    parser.add_argument("--no-llm-cache", action="store_true", help="bypass cached LLM responses")
+    parser.add_argument("--batch", metavar="FILE", help="research every topic in FILE (JSONL or one per line, '-' for stdin)")
+    parser.add_argument("--llm-batch", action="store_true", help="in batch mode, send each LLM stage for all topics as Message Batches (slower, cheaper)")
+    parser.add_argument("--resume", metavar="RUN_ID", help="continue an interrupted run from its last completed stage")
+    parser.add_argument("--debug", action="store_true", help="also save scraped pages and follow-up questions in the run directory")
+    parser.add_argument("--workers", type=int, help="topics researched at once in batch mode, or worker processes with --serve")
+    parser.add_argument("--serve", action="store_true", help="run a local HTTP research service with warm worker processes")
+    parser.add_argument("--host", default=CONFIG.get("SERVICE_HOST", "127.0.0.1"), help="address the service listens on")
+    parser.add_argument("--port", type=int, default=CONFIG.get("SERVICE_PORT", 8765), help="port the service listens on")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
+    args = parse_args(sys.argv[1:])
+    if not args.topic and not args.batch and not args.resume and not args.serve:
         logger.error("Please provide a research topic as a command-line argument.")
         sys.exit(1)
-    
-    topic = " ".join(sys.argv[1:])
-    
-    researcher = Researcher(num_results=CONFIG["NUM_SEARCH_RESULTS"])
-    
-    report_filename = researcher.general_purpose_research(topic)
-    
-    logger.info(f"Research completed. Report saved as {report_filename}")
\ No newline at end of file
+    if args.debug:
+        CONFIG["DEBUG_OUTPUT"] = True
+
+    researcher_options = {
+        "use_cache": False if args.fresh else None,
+        "use_corpus": False if args.fresh else None,
+        "use_llm_cache": False if args.no_llm_cache else None,
+    }
+
+    if args.serve:
+        serve(args.host, args.port, workers=args.workers, researcher_options=researcher_options)
+        sys.exit(0)
+
+    researcher = Researcher(num_results=CONFIG["NUM_SEARCH_RESULTS"], **researcher_options)
+    workers = args.workers or CONFIG.get("BATCH_WORKERS", 4)
+
+    if args.batch:
+        stream = sys.stdin if args.batch == "-" else open(args.batch)
+        with stream:
+            if args.llm_batch:
+                failures = run_message_batches(read_topics(stream), researcher, sys.stdout, workers=workers)
+            else:
+                failures = run_batch(read_topics(stream), researcher, sys.stdout, workers=workers)
+        sys.exit(1 if failures else 0)
+
+    try:
+        if args.resume:
+            report_filename = researcher.resume_research(args.resume)
+        else:
+            report_filename = researcher.general_purpose_research(" ".join(args.topic))
+    except Exception as e:
+        logger.error(f"Research failed: {str(e)}")
+        sys.exit(1)
+
+    logger.info(f"Research completed. Report saved as {report_filename}")
@@ -0,0 +1,286 @@
+import asyncio
+import codecs
+import logging
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+from anthropic import AsyncAnthropic
+
+from config import CONFIG
+from src.cache import normalize_url, revalidation_headers
+from src.dedup import PageDeduplicator
+from src.records import PageResult
+from src.extractor import StreamingExtractor
+from src.http_session import AsyncHTTPSession, TokenBucket
+from src.instrumentation import Tracer, export_trace, use_tracer
+from src import instrumentation
+from src.report_generator import AIModelInterface, LLMError, ReportGenerator
+from src.checkpoint import new_run_id
+from src.run_output import RunOutput, use_run
+from src.scraper import ScraperBase, collect_research, parse_search_results, split_questions
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx negotiates HTTP/2 only when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class AsyncScraper(ScraperBase):
+    """Async counterpart of Scraper sharing one httpx connection pool.
+
+    Requests go through an AsyncHTTPSession with the same retries and
+    per-domain rate limits as Scraper, plus a global rate limit shared by
+    all topics.
+    """
+
+    def __init__(self, http_client, num_results=3, rate_limiter=None, per_host_limit=None, use_cache=None,
+                 use_corpus=None):
+        super().__init__(num_results, per_host_limit, use_cache, use_corpus)
+        self.session = AsyncHTTPSession(http_client)
+        self.rate_limiter = rate_limiter or TokenBucket(CONFIG.get("ASYNC_FETCH_RATE", 10))
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host_limit))
+
+    async def _read(self, url, extractor=None, stats=None):
+        """GET url through the HTTP cache, feeding the body to extractor if given.
+
+        Returns the text that was read; reading stops early once the extractor
+        has enough content or max_page_bytes is reached. Only bodies read to
+        the end or the cap (or fully downloaded) are cached, like Scraper._stream.
+        """
+        stats = {} if stats is None else stats
+        key = normalize_url(url)
+        entry = self.cache.get(key) if self.cache else None
+        if entry and entry.fresh:
+            stats["cache"] = "hit"
+            if extractor:
+                extractor.feed(entry.value)
+            return entry.value
+
+        headers = {**self.headers, **revalidation_headers(entry)}
+        stats["cache"] = "revalidate" if entry else ("miss" if self.cache else "off")
+
+        async with self._host_slots[urlsplit(url).netloc.lower()]:
+            await self.rate_limiter.acquire_async()
+            response = await self.session.get(url, headers=headers)
+            try:
+                if entry and response.status_code == 304:
+                    stats["cache"] = "revalidated"
+                    self.cache.refresh(key)
+                    if extractor:
+                        extractor.feed(entry.value)
+                    return entry.value
+
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                body = []
+                received = 0
+                complete = True
+                async for chunk in response.aiter_bytes():
+                    received += len(chunk)
+                    stats["bytes"] = received
+                    instrumentation.count("bytes_fetched", len(chunk))
+                    text = decoder.decode(chunk)
+                    body.append(text)
+                    if received >= self.max_page_bytes:
+                        logger.info(f"Stopped reading {url} at {received} bytes")
+                        break
+                    if extractor and extractor.feed(text):
+                        complete = False
+                        break
+                content_length = response.headers.get("Content-Length")
+                if content_length and response.num_bytes_downloaded >= int(content_length):
+                    complete = True
+            finally:
+                await response.aclose()
+
+        if complete:
+            self._store(key, body, response.headers)
+        return "".join(body)
+
+    async def get_search_results(self, query):
+        try:
+            with instrumentation.span("search", query=query) as attrs:
+                html = await self._read(self._search_url(query), stats=attrs)
+            with instrumentation.span("parse_search"):
+                return parse_search_results(html, self.num_results)
+        except Exception as e:
+            logger.error(f"Error getting search results for query '{query}': {str(e)}")
+            return []
+
+    async def scrape_website(self, url):
+        try:
+            extractor = StreamingExtractor(self.max_content_chars)
+            with instrumentation.span("fetch", url=url) as attrs:
+                await self._read(url, extractor, attrs)
+                title, text_content = extractor.result()
+            return self._page(url, title, text_content)
+        except Exception as e:
+            logger.error(f"Error scraping website {url}: {str(e)}")
+            return PageResult.failed(url, e)
+
+    async def scrape_many(self, urls, dedup=None):
+        """Scrape urls concurrently, returning one result per distinct page in the order of urls."""
+        dedup = dedup or PageDeduplicator()
+        await self.scrape_into(urls, dedup)
+        return self._scraped(urls, dedup)
+
+    async def scrape_into(self, urls, dedup):
+        """Concurrently scrape the urls whose pages dedup has not seen yet, adding the results to it."""
+        for result in await asyncio.gather(*(self.scrape_website(url) for url in dedup.claim(urls))):
+            dedup.add(result)
+
+    async def search_sources(self, query, dedup=None):
+        """Return (urls to scrape, pages already in the local corpus) for query, like Scraper.search_sources."""
+        local_pages, sufficient = self._lookup_corpus(query, dedup)
+        if sufficient:
+            return [], local_pages
+        return self._choose_sources(query, await self.get_search_results(query), local_pages)
+
+    async def search_and_scrape(self, topic, dedup=None):
+        logger.info(f"Starting search and scrape for topic: {topic}")
+
+        dedup = dedup or PageDeduplicator()
+        urls, local_pages = await self.search_sources(topic, dedup)
+        if local_pages:
+            return dedup.adopt(local_pages)
+
+        if not urls:
+            logger.warning(f"No search results found for topic: {topic}")
+            return []
+
+        return await self.scrape_many(urls, dedup)
+
+
+class AsyncAIModelInterface(AIModelInterface):
+    """Async counterpart of AIModelInterface with a shared concurrency and rate budget."""
+
+    def __init__(self, client=None, http_client=None, use_cache=None, concurrency=None, rate_limiter=None):
+        super().__init__(
+            client=client or AsyncAnthropic(api_key=CONFIG["ANTHROPIC_API_KEY"], http_client=http_client),
+            use_cache=use_cache,
+        )
+        self._slots = asyncio.Semaphore(concurrency or CONFIG.get("ASYNC_LLM_CONCURRENCY", 4))
+        self.rate_limiter = rate_limiter or TokenBucket(CONFIG.get("ASYNC_LLM_RATE", 1))
+
+    async def generate_response(self, prompt, max_tokens=2000, stage="response"):
+        with instrumentation.span(f"llm.{stage}", max_tokens=max_tokens) as attrs:
+            try:
+                self.conversation_logger.log_interaction("user", prompt)
+
+                cached = self._cached_response(prompt, max_tokens, attrs)
+                if cached is not None:
+                    return cached
+
+                async with self._slots:
+                    await self.rate_limiter.acquire_async()
+                    response = await self.anthropic.messages.create(**self._message_params(prompt, max_tokens))
+
+                return self._handle_response(prompt, max_tokens, response, attrs)
+            except Exception as e:
+                self._handle_error(e, attrs)
+                raise LLMError(stage, str(e)) from e
+
+
+class AsyncResearcher:
+    """Runs many research topics concurrently on one event loop.
+
+    All topics share one HTTP connection pool (used for both scraping and the
+    Anthropic API), one page-fetch rate budget and one LLM concurrency/rate
+    budget. Use it as an async context manager so the pool is closed.
+
+    Scraping, caching, the corpus, retries and the report stages are shared
+    with Researcher, and a stage in which an LLM call fails raises, as it
+    does there. Unlike Researcher, it does not checkpoint stages (so runs
+    cannot be resumed), stream the report (STREAM_REPORT) or research
+    follow-up questions while they are generated (PIPELINE_OVERLAP).
+    """
+
+    def __init__(self, num_results=3, max_topics=None, use_cache=None, use_llm_cache=None, ai_client=None,
+                 use_corpus=None):
+        self.http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(CONFIG.get("READ_TIMEOUT", 15), connect=CONFIG.get("CONNECT_TIMEOUT", 5)),
+            limits=httpx.Limits(max_connections=CONFIG.get("ASYNC_MAX_CONNECTIONS", 32)),
+            http2=HTTP2_AVAILABLE,
+        )
+        self.scraper = AsyncScraper(self.http_client, num_results, use_cache=use_cache, use_corpus=use_corpus)
+        self.ai_model = AsyncAIModelInterface(client=ai_client, http_client=self.http_client, use_cache=use_llm_cache)
+        self.report_generator = ReportGenerator(self.ai_model)
+        self._topic_slots = asyncio.Semaphore(max_topics or CONFIG.get("ASYNC_MAX_TOPICS", 4))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+    async def run_stage(self, steps):
+        """Drive a ReportGenerator stage generator with async LLM calls and return its result.
+
+        A failed call raises LLMError, like Researcher's stages.
+        """
+        response = None
+        try:
+            while True:
+                request = steps.send(response)
+                response = await self.ai_model.generate_response(request.prompt, request.max_tokens, request.stage)
+        except StopIteration as done:
+            return done.value
+
+    async def research_followup_questions(self, questions, dedup=None):
+        """Perform additional research based on follow-up questions."""
+        logger.info("Researching follow-up questions")
+        questions = split_questions(questions)
+
+        dedup = dedup or PageDeduplicator()
+        question_sources = await asyncio.gather(*(self.scraper.search_sources(q, dedup) for q in questions))
+        await self.scraper.scrape_into([url for urls, _ in question_sources for url in urls], dedup)
+        return collect_research(questions, question_sources, dedup)
+
+    async def general_purpose_research(self, topic, tracer=None, run_id=None):
+        tracer = tracer or Tracer(run=topic)
+        output = RunOutput(run_id or new_run_id(topic))
+        async with self._topic_slots:
+            with use_tracer(tracer), use_run(output):
+                try:
+                    with tracer.span("research", topic=topic, run_id=output.run_id):
+                        report_filename = await self._research(topic, output)
+                    export_trace(tracer, "research", output.directory)
+                finally:
+                    output.close()
+            return report_filename
+
+    async def _research(self, topic, output):
+        logger.info(f"Starting research on topic: {topic}")
+        generator = self.report_generator
+
+        dedup = PageDeduplicator(CONFIG.get("CONTENT_DEDUP_DISTANCE", 3))
+        initial_research_data = await self.scraper.search_and_scrape(topic, dedup)
+
+        initial_report = await self.run_stage(generator.initial_report_steps(topic, initial_research_data))
+        followup_questions = await self.run_stage(generator.followup_questions_steps(initial_report))
+
+        additional_research_data = await self.research_followup_questions(followup_questions, dedup)
+
+        enhanced_report = await self.run_stage(
+            generator.enhancement_steps(initial_report, followup_questions, additional_research_data))
+
+        html_report = await asyncio.to_thread(
+            generator.generate_html_report, enhanced_report, f"{topic} Research Report")
+
+        report_filename = output.write("report.html", html_report)
+
+        logger.info(f"Deduplication stats for '{topic}': {dedup.stats()}")
+        logger.info(f"Research on '{topic}' completed. HTML report saved as {report_filename}")
+        return report_filename
+
+    async def research_many(self, topics):
+        """Research all topics concurrently, returning report filenames (or exceptions) in order."""
+        return await asyncio.gather(
+            *(self.general_purpose_research(topic) for topic in topics), return_exceptions=True)
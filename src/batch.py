@@ -0,0 +1,82 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from src.checkpoint import new_run_id
+from src.instrumentation import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+def read_topics(stream):
+    """Yield topics from a stream of JSONL records or plain one-topic-per-line text.
+
+    A line that parses as a JSON object is a record with a "topic" key; any
+    other line, quotes included, is the topic itself. Blank lines and lines
+    starting with '#' are skipped.
+    """
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        topic = line
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            if isinstance(record, dict):
+                topic = record.get("topic")
+        if not isinstance(topic, str) or not topic.strip():
+            logger.warning(f"Skipping line {line_number}: no topic found")
+            continue
+        yield topic.strip()
+
+
+def _research_topic(researcher, topic):
+    started_at = datetime.now().isoformat()
+    start = time.perf_counter()
+    run_id = new_run_id(topic)
+    record = {"topic": topic, "run_id": run_id, "started_at": started_at}
+    tracer = Tracer(run=topic)
+    try:
+        record["report"] = researcher.general_purpose_research(topic, tracer=tracer, run_id=run_id)
+        record["status"] = "ok"
+    except Exception as e:
+        logger.error(f"Research on '{topic}' failed: {str(e)}")
+        record["status"] = "error"
+        record["error"] = str(e)
+    record["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    record["stages"] = {name: stats["total"] for name, stats in tracer.stage_stats().items()}
+    record["counters"] = dict(tracer.counters)
+    return record
+
+
+def run_batch(topics, researcher, out, workers=4):
+    """Research topics on a pool of worker threads sharing one Researcher.
+
+    The shared Researcher means its scraper and LLM caches stay warm across
+    topics. One JSON record per topic is written to out as soon as it finishes.
+    Returns the number of topics that failed.
+    """
+    failures = 0
+    topics = iter(topics)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            # Keep a bounded number of topics in flight so huge inputs are read lazily
+            for topic in topics:
+                pending.add(executor.submit(_research_topic, researcher, topic))
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                failures += record["status"] != "ok"
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    return failures
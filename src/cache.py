@@ -0,0 +1,175 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import json
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from src import instrumentation
+
+logger = logging.getLogger(__name__)
+
+CacheEntry = namedtuple("CacheEntry", ["value", "meta", "fresh"])
+
+
+def normalize_url(url):
+    """Normalize a URL so equivalent spellings share one cache key."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def revalidation_headers(entry):
+    """Conditional request headers for revalidating a stale HTTP cache entry."""
+    headers = {}
+    if entry and entry.meta.get("etag"):
+        headers["If-None-Match"] = entry.meta["etag"]
+    if entry and entry.meta.get("last_modified"):
+        headers["If-Modified-Since"] = entry.meta["last_modified"]
+    return headers
+
+
+def response_meta(headers):
+    """Validators worth storing alongside a cached HTTP response."""
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+class DiskCache:
+    """SQLite-backed text cache with TTL expiry and an LRU size cap.
+
+    Values are stored zlib-compressed alongside a small JSON metadata dict
+    (e.g. ETag/Last-Modified for HTTP revalidation). Expired entries are
+    still returned by get() with fresh=False so callers can revalidate them.
+    The stored size is tracked as a running total, and access times are
+    buffered and written every touch_batch reads, so neither get() nor set()
+    scans the table unless the cache is over max_bytes.
+    """
+
+    def __init__(self, path, ttl=None, max_bytes=None, name="cache", touch_batch=64):
+        self.path = path
+        self.name = name
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._reads = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB, meta TEXT, size INTEGER, "
+            "stored_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._conn.commit()
+        self._total = self._stored_bytes()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                instrumentation.count(f"{self.name}_cache_misses")
+                return None
+
+            value, meta, stored_at = row
+            fresh = self.ttl is None or time.time() - stored_at < self.ttl
+            if fresh:
+                self.hits += 1
+                instrumentation.count(f"{self.name}_cache_hits")
+            else:
+                self.misses += 1
+                instrumentation.count(f"{self.name}_cache_misses")
+            self._touched[key] = time.time()
+            self._reads += 1
+            if self._reads >= self.touch_batch:
+                self._flush_touches()
+                self._conn.commit()
+            return CacheEntry(zlib.decompress(value).decode("utf-8"), json.loads(meta), fresh)
+
+    def set(self, key, value, meta=None):
+        blob = zlib.compress(value.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._touched.pop(key, None)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, meta, size, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, json.dumps(meta or {}), len(blob), now, now),
+            )
+            self._total += len(blob) - (row[0] if row else 0)
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key):
+        """Mark a stale entry as fresh again after a successful revalidation."""
+        now = time.time()
+        with self._lock:
+            self.revalidated += 1
+            instrumentation.count(f"{self.name}_cache_revalidations")
+            self._touched.pop(key, None)
+            self._conn.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _stored_bytes(self):
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _flush_touches(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+        self._touched = {}
+        self._reads = 0
+
+    def _evict(self):
+        if not self.max_bytes or self._total <= self.max_bytes:
+            return
+        # Other processes may share the file, so recount before evicting, and order by up-to-date access times
+        self._flush_touches()
+        total = self._stored_bytes()
+        if total <= self.max_bytes:
+            self._total = total
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self._total = total
+        logger.debug(f"Evicted {evicted} entries from {self.path}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+    def clear(self):
+        with self._lock:
+            self._touched = {}
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._total = 0
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
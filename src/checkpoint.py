@@ -0,0 +1,58 @@
+import json
+import logging
+import os
+import pickle
+import re
+import secrets
+import shutil
+from datetime import datetime
+
+from src.fileutil import atomic_write
+
+logger = logging.getLogger(__name__)
+
+
+def new_run_id(topic):
+    """Unique, filesystem-safe ID for one research run of topic."""
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-')[:40] or "run"
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{slug}-{secrets.token_hex(3)}"
+
+
+class CheckpointStore:
+    """Stage outputs of one research run, pickled to <state dir>/<run id>/<stage>.pickle.
+
+    Each save is atomic, so a run killed mid-write leaves the previous
+    checkpoint intact. run.json records the topic so a run can be resumed
+    from its ID alone.
+    """
+
+    def __init__(self, state_dir, run_id):
+        self.run_id = run_id
+        self.directory = os.path.join(state_dir, run_id)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.pickle")
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.directory, "run.json"))
+
+    def save_meta(self, **meta):
+        atomic_write(os.path.join(self.directory, "run.json"), json.dumps({"run_id": self.run_id, **meta}))
+
+    def load_meta(self):
+        with open(os.path.join(self.directory, "run.json")) as f:
+            return json.load(f)
+
+    def has(self, name):
+        return os.path.exists(self._path(name))
+
+    def load(self, name):
+        with open(self._path(name), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, name, value):
+        atomic_write(self._path(name), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        logger.debug(f"Checkpointed stage '{name}' of run {self.run_id}")
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
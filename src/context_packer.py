@@ -0,0 +1,157 @@
+import logging
+import math
+import re
+import zlib
+from collections import Counter, defaultdict
+
+from src import instrumentation
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_WORD = re.compile(r'\w+')
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def split_passages(text, max_words=80):
+    """Split text into passages of whole sentences holding at most ~max_words words."""
+    passages = []
+    current = []
+    words = 0
+    for sentence in _SENTENCE_END.split(text.strip()):
+        sentence_words = len(sentence.split())
+        if current and words + sentence_words > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += sentence_words
+    if current:
+        passages.append(" ".join(current))
+    return [passage for passage in passages if passage.strip()]
+
+
+class MinHashIndex:
+    """Near-duplicate detector using MinHash signatures of word shingles with LSH banding.
+
+    Each passage is reduced to `bands * rows` minimum hashes over its word
+    shingles; passages sharing any band are compared by signature agreement,
+    which estimates their Jaccard similarity.
+    """
+
+    def __init__(self, threshold=0.8, shingle_size=5, bands=8, rows=4):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        # Fixed coefficients so signatures are stable across runs
+        self._coefficients = [(2 * i + 1) * 0x9E3779B1 % _MERSENNE_PRIME for i in range(bands * rows)]
+        self._offsets = [(i + 1) * 0x7F4A7C15 % _MERSENNE_PRIME for i in range(bands * rows)]
+        self._buckets = defaultdict(list)
+        self._signatures = []
+
+    def _signature(self, text):
+        words = _WORD.findall(text.lower())
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8"))
+                    for i in range(max(len(words) - size + 1, 1))}
+        return [
+            min(((a * shingle + b) % _MERSENNE_PRIME) & _MAX_HASH for shingle in shingles)
+            for a, b in zip(self._coefficients, self._offsets)
+        ]
+
+    def add_if_new(self, text):
+        """Index text and return True, or return False if it near-duplicates an indexed passage."""
+        signature = self._signature(text)
+        bands = [(band, tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+        candidates = {index for key in bands for index in self._buckets.get(key, ())}
+        for index in candidates:
+            other = self._signatures[index]
+            agreement = sum(x == y for x, y in zip(signature, other)) / len(signature)
+            if agreement >= self.threshold:
+                return False
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for key in bands:
+            self._buckets[key].append(index)
+        return True
+
+
+def bm25_scores(query, passages, k1=1.5, b=0.75):
+    """Okapi BM25 relevance of each passage to query."""
+    tokenized = [_WORD.findall(passage.lower()) for passage in passages]
+    if not tokenized:
+        return []
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens))
+    query_terms = set(_WORD.findall(query.lower()))
+
+    scores = []
+    for tokens in tokenized:
+        frequencies = Counter(tokens)
+        score = 0.0
+        for term in query_terms:
+            frequency = frequencies.get(term)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (len(tokenized) - df + 0.5) / (df + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+    return scores
+
+
+class ContextPacker:
+    """Selects the most relevant, non-duplicate passages of scraped pages for a prompt.
+
+    Pages are split into sentence passages, passages that near-duplicate one
+    already seen (in this or an earlier pack() call) are dropped, the rest are
+    ranked by BM25 against the query and kept greedily until the token budget
+    is spent. Kept passages are returned in their original page order.
+    """
+
+    def __init__(self, dedup_threshold=0.8, passage_words=80):
+        self.passage_words = passage_words
+        self._index = MinHashIndex(threshold=dedup_threshold)
+
+    def pack(self, query, documents, token_budget):
+        """Return one excerpt per document (possibly empty) fitting token_budget in total."""
+        candidates = []
+        duplicates = 0
+        original_tokens = 0
+        for doc_index, document in enumerate(documents):
+            original_tokens += estimate_tokens(document)
+            for position, passage in enumerate(split_passages(document, self.passage_words)):
+                if self._index.add_if_new(passage):
+                    candidates.append((doc_index, position, passage))
+                else:
+                    duplicates += 1
+
+        scores = bm25_scores(query, [passage for _, _, passage in candidates])
+        ranked = sorted(zip(scores, candidates), key=lambda item: (-item[0], item[1][0], item[1][1]))
+
+        selected = []
+        used = 0
+        for _, candidate in ranked:
+            cost = estimate_tokens(candidate[2])
+            if used + cost > token_budget:
+                continue
+            selected.append(candidate)
+            used += cost
+
+        excerpts = [[] for _ in documents]
+        for doc_index, _, passage in sorted(selected):
+            excerpts[doc_index].append(passage)
+
+        logger.info(f"Packed context for '{query[:60]}': {len(selected)}/{len(candidates)} passages, "
+                    f"{duplicates} duplicates dropped, ~{used}/{original_tokens} tokens")
+        instrumentation.count("context_duplicate_passages", duplicates)
+        instrumentation.count("context_tokens_saved", max(original_tokens - used, 0))
+        return [" ".join(passages) for passages in excerpts]
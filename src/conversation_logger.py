@@ -1,24 +1,109 @@
+import atexit
+import gzip
 import json
+import os
+import secrets
+import threading
+import time
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:  # not available on Windows; fall back to in-process locking only
+    fcntl = None
+
+
+def _is_compressed(path):
+    return path.endswith(".gz")
+
+
+def read_conversation(log_file_path, session=None):
+    """Lazily yield the interactions stored in a JSONL (optionally .gz) conversation log.
+
+    With session, only the interactions logged by that ConversationLogger are
+    yielded, since several loggers (runs or processes) may share one file.
+    """
+    if not os.path.exists(log_file_path):
+        return
+    opener = gzip.open if _is_compressed(log_file_path) else open
+    with opener(log_file_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            interaction = json.loads(line)
+            if session is None or interaction.get("session") == session:
+                yield interaction
+
+
 class ConversationLogger:
-    def __init__(self, log_file_path):
+    """Append-only JSONL conversation log with buffered writes.
+
+    Interactions are buffered in memory and appended in batches once
+    flush_every records are pending, flush_interval seconds have passed, or a
+    system (error) message is logged. Each batch is appended under an
+    exclusive file lock, so several processes can share one log file. Paths
+    ending in .gz are written as concatenated gzip members. Every record
+    carries the logger's session ID, so its own conversation can be told
+    apart from others in the same file.
+    """
+
+    def __init__(self, log_file_path, flush_every=20, flush_interval=5.0):
         self.log_file_path = log_file_path
-        self.conversation = []
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.session = secrets.token_hex(8)
+        self._buffer = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
 
     def log_interaction(self, role, content):
         timestamp = datetime.now().isoformat()
         interaction = {
             "timestamp": timestamp,
+            "session": self.session,
             "role": role,
             "content": content
         }
-        self.conversation.append(interaction)
-        self._save_to_file()
+        line = json.dumps(interaction) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            if (role == "system" or len(self._buffer) >= self.flush_every
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush and stop flushing at exit, for loggers that live shorter than the process."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._buffer:
+            return
+
+        data = "".join(self._buffer).encode("utf-8")
+        if _is_compressed(self.log_file_path):
+            data = gzip.compress(data)
 
-    def _save_to_file(self):
-        with open(self.log_file_path, 'w') as f:
-            json.dump(self.conversation, f, indent=2)
+        if os.path.dirname(self.log_file_path):
+            os.makedirs(os.path.dirname(self.log_file_path), exist_ok=True)
+        with open(self.log_file_path, "ab") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(data)
+                f.flush()
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        self._buffer = []
 
     def get_full_conversation(self):
-        return self.conversation
\ No newline at end of file
+        """The interactions logged by this logger, without those of others sharing its file."""
+        self.flush()
+        return list(read_conversation(self.log_file_path, self.session))
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from src import instrumentation
+from src.dedup import canonicalize_url
+from src.records import PageResult
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'\w+')
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "as", "at", "be", "been", "by", "can", "could", "did", "do",
+    "does", "for", "from", "had", "has", "have", "how", "in", "into", "is", "it", "its", "latest", "more", "most",
+    "of", "on", "or", "other", "recent", "some", "such", "than", "that", "the", "their", "there", "these", "they",
+    "this", "those", "to", "was", "were", "what", "when", "where", "which", "who", "why", "will", "with", "would",
+}
+
+
+def _term_key(word):
+    # Crude stemming so "advances" counts as covering "advancements", much like FTS5's porter tokenizer
+    return word[:6]
+
+
+def query_terms(query):
+    """Distinct lowercase words of query worth matching, without stopwords."""
+    return list(dict.fromkeys(
+        word for word in _WORD.findall(query.lower()) if word not in STOPWORDS and (len(word) > 1 or word.isdigit())
+    ))
+
+
+class Corpus:
+    """Local full-text corpus of every extracted page, shared across runs and topics.
+
+    Pages are stored once per canonical URL in SQLite with an FTS5 index over
+    title and text. lookup() answers a query from the corpus when enough
+    recently fetched pages cover most of its terms, so the web is only
+    searched when local recall is too low or the matching pages are stale.
+    """
+
+    def __init__(self, path, max_age=None, min_coverage=0.6):
+        self.path = path
+        self.max_age = max_age
+        self.min_coverage = min_coverage
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "id INTEGER PRIMARY KEY, key TEXT UNIQUE, url TEXT, title TEXT, content TEXT, fetched_at REAL);"
+            "CREATE INDEX IF NOT EXISTS pages_fetched_at ON pages (fetched_at);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5("
+            "title, content, content='pages', content_rowid='id', tokenize='porter unicode61');"
+            # Keep the external-content FTS index in step with the pages table
+            "CREATE TRIGGER IF NOT EXISTS pages_ai AFTER INSERT ON pages BEGIN "
+            "INSERT INTO pages_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END;"
+            "CREATE TRIGGER IF NOT EXISTS pages_ad AFTER DELETE ON pages BEGIN "
+            "INSERT INTO pages_fts (pages_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END;"
+            "CREATE TRIGGER IF NOT EXISTS pages_au AFTER UPDATE ON pages BEGIN "
+            "INSERT INTO pages_fts (pages_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO pages_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END;"
+        )
+        self._conn.commit()
+
+    def add(self, page, fetched_at=None):
+        """Store or refresh an extracted page; pages with errors or no text are ignored."""
+        if page.error or not page.content:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (key, url, title, content, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET url = excluded.url, title = excluded.title, "
+                "content = excluded.content, fetched_at = excluded.fetched_at",
+                (canonicalize_url(page.url), page.url, page.title, page.content, fetched_at or time.time()),
+            )
+            self._conn.commit()
+
+    def search(self, query, limit=10, exclude=()):
+        """Pages matching query as (page, fetched_at, coverage), best BM25 rank first.
+
+        coverage is the fraction of the query's terms found in the page; pages
+        below min_coverage, or whose canonical URL is in exclude, are left out.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT pages.key, pages.url, pages.title, pages.content, pages.fetched_at FROM pages_fts "
+                "JOIN pages ON pages.id = pages_fts.rowid WHERE pages_fts MATCH ? "
+                "ORDER BY bm25(pages_fts, 2.0, 1.0) LIMIT ?",
+                (match, limit * 5 + len(exclude)),
+            ).fetchall()
+
+        keys = {_term_key(term) for term in terms}
+        hits = []
+        for key, url, title, content, fetched_at in rows:
+            if key in exclude:
+                continue
+            words = {_term_key(word) for word in _WORD.findall(f"{title} {content}".lower())}
+            coverage = len(keys & words) / len(keys)
+            if coverage >= self.min_coverage:
+                hits.append((PageResult(url, title, content), fetched_at, coverage))
+        return hits[:limit]
+
+    def lookup(self, query, limit, exclude=()):
+        """Return (pages, sufficient) for query.
+
+        sufficient is True when at least `limit` pages fetched within max_age
+        match the query, in which case pages holds just those; otherwise pages
+        holds whatever matches, stale or not, for use when the web is
+        unreachable. Pages whose canonical URL is in exclude (e.g. those the
+        current run already has) are never returned.
+        """
+        with instrumentation.span("corpus_search", query=query) as attrs:
+            hits = self.search(query, limit * 2, exclude)
+            cutoff = time.time() - self.max_age if self.max_age else 0
+            fresh = [page for page, fetched_at, _ in hits if fetched_at >= cutoff]
+            sufficient = len(fresh) >= limit
+            attrs["hits"] = len(hits)
+            attrs["sufficient"] = sufficient
+
+        with self._lock:
+            if sufficient:
+                self.hits += 1
+            else:
+                self.misses += 1
+        instrumentation.count("corpus_hits" if sufficient else "corpus_misses")
+        if sufficient:
+            logger.info(f"Answered '{query}' from the local corpus ({len(fresh)} fresh pages)")
+            return fresh[:limit], True
+        return [page for page, _, _ in hits[:limit]], False
+
+    def stats(self):
+        with self._lock:
+            pages = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        return {"pages": pages, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,200 @@
+import hashlib
+import logging
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from src import instrumentation
+from src.context_packer import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+TRACKING_PARAMS = {
+    "gclid", "dclid", "fbclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ref_src", "ref_url", "spm", "cmpid", "ncid", "ocid",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+MIRROR_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+_WORD = re.compile(r'\w+')
+
+
+def canonicalize_url(url):
+    """Reduce a URL to a key shared by the spellings that usually serve the same page.
+
+    Lowercases scheme and host, treats http as https, drops a www/m/amp host
+    prefix (when a registrable name is left), default ports, fragments,
+    tracking and AMP query parameters, /amp path segments and trailing
+    slashes, and sorts the query.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme == "http":
+        scheme = "https"
+    host = (parts.hostname or "").lower()
+    for prefix in MIRROR_HOST_PREFIXES:
+        # m.example.com is a mirror of example.com, but m.com is a site of its own
+        if host.startswith(prefix) and "." in host[len(prefix):]:
+            host = host[len(prefix):]
+            break
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if segments and segments[0] == "amp":
+        segments = segments[1:]
+    if segments and segments[-1] == "amp":
+        segments = segments[:-1]
+    path = "/" + "/".join(segments)
+
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(name, value)
+    ))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _is_tracking_param(name, value):
+    name = name.lower()
+    if name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES):
+        return True
+    # ?amp, ?amp=1 and ?outputType=amp select the AMP rendering of the same article
+    return name == "amp" or (name == "outputtype" and value.lower() == "amp")
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of text over word shingles; similar texts differ in few bits."""
+    words = _WORD.findall(text.lower())
+    size = min(shingle_size, len(words)) or 1
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(" ".join(words[i:i + size]).encode("utf-8"), digest_size=8).digest(),
+                              "big"), "064b")
+        for i in range(max(len(words) - size + 1, 1))
+    ]
+    # Bit columns set in more than half of the shingle hashes
+    majority = "".join("1" if column.count("1") * 2 > len(hashes) else "0" for column in map("".join, zip(*hashes)))
+    return int(majority, 2)
+
+
+class SimHashIndex:
+    """Finds fingerprints within max_distance bits of an indexed one.
+
+    Fingerprints are split into max_distance + 1 bands; two fingerprints that
+    differ in at most max_distance bits must agree exactly on at least one
+    band, so only fingerprints sharing a band are compared.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._band_bits = -(-64 // self.bands)
+        self._buckets = defaultdict(list)
+
+    def _keys(self, fingerprint):
+        mask = (1 << self._band_bits) - 1
+        return [(band, fingerprint >> band * self._band_bits & mask) for band in range(self.bands)]
+
+    def find(self, fingerprint):
+        """Return the item of an indexed near-duplicate fingerprint, or None."""
+        for key in self._keys(fingerprint):
+            for other, item in self._buckets.get(key, ()):
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return item
+        return None
+
+    def add(self, fingerprint, item):
+        for key in self._keys(fingerprint):
+            self._buckets[key].append((fingerprint, item))
+
+
+class PageDeduplicator:
+    """Per-run index of scraped pages keyed by canonical URL and content fingerprint.
+
+    claim() filters out URLs whose canonical form was already fetched in this
+    run, add() stores a scraped result and merges it into an earlier page when
+    their content is a near-duplicate, and results() maps URLs back to the
+    distinct pages they resolve to. Fetches and prompt tokens saved are kept
+    on the instance and counted on the current tracer.
+    """
+
+    def __init__(self, max_distance=3):
+        self.fetches_saved = 0
+        self.pages_merged = 0
+        self.tokens_saved = 0
+        self._pages = {}
+        self._merged = {}
+        self._index = SimHashIndex(max_distance)
+        self._lock = threading.Lock()
+
+    def claim(self, urls):
+        """Return the URLs that still need fetching, one spelling per canonical page."""
+        new_urls = []
+        saved = 0
+        with self._lock:
+            for url in dict.fromkeys(urls):
+                key = canonicalize_url(url)
+                if key in self._pages:
+                    saved += 1
+                    continue
+                self._pages[key] = None
+                new_urls.append(url)
+            self.fetches_saved += saved
+        if saved:
+            instrumentation.count("dedup_fetches_saved", saved)
+        return new_urls
+
+    def add(self, result):
+        """Store a scraped result for its URL, merging it into an earlier near-duplicate page."""
+        key = canonicalize_url(result.url)
+        fingerprint = simhash(result.content) if result.content and not result.error else None
+        with self._lock:
+            self._pages[key] = result
+            if fingerprint is None:
+                return
+            original = self._index.find(fingerprint)
+            if original is None:
+                self._index.add(fingerprint, key)
+                return
+            self._merged[key] = original
+            self.pages_merged += 1
+        logger.info(f"Merged {result.url} into near-duplicate {self._pages[original].url}")
+        instrumentation.count("dedup_pages_merged")
+
+    def adopt(self, pages):
+        """Add pages obtained without fetching (e.g. from the corpus) and return results() for them."""
+        with self._lock:
+            new_pages = [page for page in pages if self._pages.get(canonicalize_url(page.url)) is None]
+        for page in new_pages:
+            self.add(page)
+        return self.results([page.url for page in pages])
+
+    def results(self, urls):
+        """Distinct scraped pages for urls, in order, with duplicate spellings and near-duplicates collapsed."""
+        pages = []
+        seen = set()
+        saved_tokens = 0
+        with self._lock:
+            for url in urls:
+                key = canonicalize_url(url)
+                key = self._merged.get(key, key)
+                page = self._pages.get(key)
+                if page is None:
+                    continue
+                if key in seen:
+                    saved_tokens += estimate_tokens(page.content) if page.content else 0
+                    continue
+                seen.add(key)
+                pages.append(page)
+            self.tokens_saved += saved_tokens
+        if saved_tokens:
+            instrumentation.count("dedup_tokens_saved", saved_tokens)
+        return pages
+
+    def keys(self):
+        """Canonical URLs of every page claimed or added in this run so far."""
+        with self._lock:
+            return set(self._pages)
+
+    def stats(self):
+        return {"fetches_saved": self.fetches_saved, "pages_merged": self.pages_merged,
+                "tokens_saved": self.tokens_saved}
@@ -0,0 +1,153 @@
+import logging
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; fall back to the stdlib parser
+    etree = None
+
+logger = logging.getLogger(__name__)
+
+# Parser backend BeautifulSoup should use for whole documents
+BS4_PARSER = "lxml" if etree is not None else "html.parser"
+
+CONTAINER_TAGS = ("main", "article", "body")
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+
+class _TextCollector:
+    """Parser target collecting the title and the text of the first main/article/body.
+
+    Works both as an lxml parser target (start/end/data/close) and behind the
+    stdlib HTMLParser adapter below. Text inside script/style-like tags is
+    skipped, as BeautifulSoup's get_text() does.
+    """
+
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.title = None
+        self._title_parts = None
+        self._skip_depth = 0
+        self._depth = {tag: 0 for tag in CONTAINER_TAGS}
+        self._state = {tag: "pending" for tag in CONTAINER_TAGS}
+        self._parts = {tag: [] for tag in CONTAINER_TAGS}
+        self._length = {tag: 0 for tag in CONTAINER_TAGS}
+
+    def start(self, tag, attrib=None):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title" and self.title is None:
+            self._title_parts = []
+        elif tag in self._depth:
+            if self._state[tag] == "pending":
+                self._state[tag] = "open"
+            self._depth[tag] += 1
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag == "title" and self._title_parts is not None:
+            self.title = "".join(self._title_parts).strip()
+            self._title_parts = None
+        elif tag in self._depth and self._depth[tag]:
+            self._depth[tag] -= 1
+            if not self._depth[tag]:
+                self._state[tag] = "done"
+
+    def data(self, data):
+        if self._skip_depth:
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+            return
+        text = data.strip()
+        if not text:
+            return
+        for tag in CONTAINER_TAGS:
+            if self._state[tag] == "open" and self._length[tag] < self.max_chars:
+                self._parts[tag].append(text)
+                self._length[tag] += len(text) + 1
+
+    def close(self):
+        return self
+
+    def _preferred(self):
+        for tag in CONTAINER_TAGS:
+            if self._state[tag] != "pending":
+                return tag
+        return None
+
+    def enough(self):
+        """True once main/article is complete or holds max_chars of text, or body is complete.
+
+        A full body alone is not enough, since a main or article may still
+        follow a long nav or header.
+        """
+        tag = self._preferred()
+        if tag is None:
+            return False
+        if tag == "body":
+            return self._state[tag] == "done"
+        return self._state[tag] == "done" or self._length[tag] >= self.max_chars
+
+    def text(self):
+        tag = self._preferred()
+        if tag is None:
+            return ""
+        return re.sub(r'\s+', ' ', " ".join(self._parts[tag]))[:self.max_chars]
+
+
+class _StdlibParser(HTMLParser):
+    """Adapts the stdlib HTMLParser callbacks to a _TextCollector target."""
+
+    def __init__(self, target):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+
+class StreamingExtractor:
+    """Incremental HTML text extractor fed one chunk at a time.
+
+    feed() returns True as soon as enough main-content text has been
+    collected, so callers streaming from the network can drop the rest of
+    the body.
+    """
+
+    def __init__(self, max_chars=5000):
+        self._collector = _TextCollector(max_chars)
+        self._parser = etree.HTMLParser(target=self._collector) if etree is not None else _StdlibParser(self._collector)
+        self._done = False
+
+    def feed(self, chunk):
+        if not self._done:
+            self._parser.feed(chunk)
+            self._done = self._collector.enough()
+        return self._done
+
+    def result(self):
+        """Return (title, text), closing the parser if the body was read to the end."""
+        if not self._done:
+            self._parser.close()
+            self._done = True
+        return self._collector.title or "", self._collector.text()
+
+
+def extract_text(chunks, max_chars=5000):
+    """Parse HTML text chunks incrementally and return (title, text)."""
+    extractor = StreamingExtractor(max_chars)
+    for chunk in chunks:
+        if extractor.feed(chunk):
+            break
+    return extractor.result()
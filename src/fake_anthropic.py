@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+
+def _default_responder(prompt, max_tokens):
+    subject = " ".join(prompt.split()[:8])
+    lines = [f"{i}. Fake finding {i} regarding {subject}?" for i in range(1, 4)]
+    return "# Fake Report\n\n## Summary\n\n" + "\n".join(lines)
+
+
+class FakeAnthropic:
+    """Local stand-in for anthropic.Anthropic used to exercise the pipeline without network.
+
+    Only the parts of the client the research pipeline touches are implemented:
+    messages.create() returning an object with .content[0].text and .usage,
+    messages.stream(), and a messages.batches endpoint whose batches finish
+    `batch_delay` seconds after they are created.
+    """
+
+    def __init__(self, delay=0.0, output_tokens=None, responder=None, batch_delay=0.0):
+        self.delay = delay
+        self.output_tokens = output_tokens
+        self.responder = responder or _default_responder
+        self.batch_delay = batch_delay
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.messages = _FakeMessages(self)
+
+    def _complete(self, model, max_tokens, messages):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return self._build_message(model, max_tokens, messages)
+
+    def _build_message(self, model, max_tokens, messages):
+        prompt = messages[-1]["content"]
+        text = self.responder(prompt, max_tokens)
+        if self.output_tokens:
+            filler = " ".join(["lorem"] * max(self.output_tokens - len(text.split()), 0))
+            text = f"{text}\n\n{filler}".rstrip()
+
+        return SimpleNamespace(
+            id=f"msg_fake_{self.calls}",
+            model=model,
+            role="assistant",
+            stop_reason="end_turn",
+            content=[SimpleNamespace(type="text", text=text)],
+            usage=SimpleNamespace(input_tokens=len(prompt.split()), output_tokens=len(text.split())),
+        )
+
+
+class _FakeMessages:
+    def __init__(self, client):
+        self._client = client
+        self.batches = _FakeBatches(client)
+
+    def create(self, model, max_tokens, messages, **kwargs):
+        return self._client._complete(model, max_tokens, messages)
+
+    def stream(self, model, max_tokens, messages, **kwargs):
+        return _FakeMessageStream(self._client, model, max_tokens, messages)
+
+
+class _FakeMessageStream:
+    """Mimics the context manager returned by messages.stream(), spreading the delay over chunks."""
+
+    def __init__(self, client, model, max_tokens, messages):
+        with client._lock:
+            client.calls += 1
+        self._client = client
+        self._message = client._build_message(model, max_tokens, messages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        chunks = re.findall(r"\S*\s*", self._message.content[0].text)
+        chunks = [chunk for chunk in chunks if chunk]
+        for chunk in chunks:
+            if self._client.delay:
+                time.sleep(self._client.delay / len(chunks))
+            yield chunk
+
+    def get_final_message(self):
+        return self._message
+
+
+_CUSTOM_ID = re.compile(r'^[a-zA-Z0-9_-]{1,64}$')
+
+
+class _FakeBatches:
+    """Mimics messages.batches: requests are answered when the batch is polled after batch_delay."""
+
+    def __init__(self, client):
+        self._client = client
+        self._batches = {}
+        self._ids = itertools.count(1)
+        self.created = 0
+
+    def create(self, requests, **kwargs):
+        requests = list(requests)
+        custom_ids = [request["custom_id"] for request in requests]
+        if not requests or len(set(custom_ids)) != len(custom_ids):
+            raise ValueError("A batch needs at least one request and unique custom_id values")
+        invalid = [custom_id for custom_id in custom_ids if not _CUSTOM_ID.match(custom_id)]
+        if invalid:
+            raise ValueError(f"Invalid custom_id values: {invalid}")
+
+        with self._client._lock:
+            batch_id = f"msgbatch_fake_{next(self._ids)}"
+            self.created += 1
+            self._batches[batch_id] = {
+                "requests": requests,
+                "ends_at": time.monotonic() + self._client.batch_delay,
+                "canceled": False,
+            }
+        return self.retrieve(batch_id)
+
+    def retrieve(self, message_batch_id, **kwargs):
+        batch = self._batches[message_batch_id]
+        ended = batch["canceled"] or time.monotonic() >= batch["ends_at"]
+        total = len(batch["requests"])
+        return SimpleNamespace(
+            id=message_batch_id,
+            type="message_batch",
+            processing_status="ended" if ended else "in_progress",
+            request_counts=SimpleNamespace(
+                processing=0 if ended else total,
+                succeeded=total if ended and not batch["canceled"] else 0,
+                errored=0,
+                canceled=total if batch["canceled"] else 0,
+                expired=0,
+            ),
+        )
+
+    def cancel(self, message_batch_id, **kwargs):
+        self._batches[message_batch_id]["canceled"] = True
+        return self.retrieve(message_batch_id)
+
+    def results(self, message_batch_id, **kwargs):
+        batch = self._batches[message_batch_id]
+        if self.retrieve(message_batch_id).processing_status != "ended":
+            raise RuntimeError(f"Batch {message_batch_id} is still processing")
+        for request in batch["requests"]:
+            if batch["canceled"]:
+                result = SimpleNamespace(type="canceled")
+            else:
+                with self._client._lock:
+                    self._client.calls += 1
+                params = request["params"]
+                message = self._client._build_message(params["model"], params["max_tokens"], params["messages"])
+                result = SimpleNamespace(type="succeeded", message=message)
+            yield SimpleNamespace(custom_id=request["custom_id"], result=result)
+
+
+class FakeAsyncAnthropic(FakeAnthropic):
+    """Async counterpart of FakeAnthropic, standing in for anthropic.AsyncAnthropic."""
+
+    def __init__(self, delay=0.0, output_tokens=None, responder=None):
+        super().__init__(delay, output_tokens, responder)
+        self.messages = _FakeAsyncMessages(self)
+
+    async def _acomplete(self, model, max_tokens, messages):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._build_message(model, max_tokens, messages)
+
+
+class _FakeAsyncMessages:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, model, max_tokens, messages, **kwargs):
+        return await self._client._acomplete(model, max_tokens, messages)
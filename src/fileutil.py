@@ -0,0 +1,44 @@
+import os
+import tempfile
+import threading
+
+_file_mode = None
+_file_mode_lock = threading.Lock()
+
+
+def _default_file_mode():
+    """The permissions open() gives new files: 0o666 minus the umask, read once."""
+    global _file_mode
+    with _file_mode_lock:
+        if _file_mode is None:
+            umask = None
+            try:
+                # Linux exposes the umask without having to change it
+                with open("/proc/self/status") as f:
+                    for line in f:
+                        if line.startswith("Umask:"):
+                            umask = int(line.split()[1], 8)
+                            break
+            except OSError:
+                pass
+            if umask is None:
+                umask = os.umask(0)
+                os.umask(umask)
+            _file_mode = 0o666 & ~umask
+        return _file_mode
+
+
+def atomic_write(path, data):
+    """Write bytes or text to path via a temporary file and rename, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        # mkstemp creates files readable by their owner only; give ours the permissions open() would
+        os.fchmod(fd, _default_file_mode())
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,77 @@
+import re
+import xml.etree.ElementTree as etree
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+HEADER_TAGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+_BULLET = re.compile(r'^\s*(?:([-•])|\d+\.)\s+')
+
+
+class ReportStructureTreeprocessor(Treeprocessor):
+    """Restructures parsed markdown in one pass over the top-level elements.
+
+    - Paragraphs whose lines are bullet ("- ", "• ") or numbered ("1. ") items,
+      as LLMs often write without the blank line markdown needs, become lists.
+    - Each header opens a <section> holding everything up to the next header
+      of the same or a higher level; deeper headers nest inside it.
+    """
+
+    def run(self, root):
+        children = list(root)
+        del root[:]
+
+        # Stack of (level, section element); level 0 is the document root
+        stack = [(0, root)]
+        for element in children:
+            level = HEADER_TAGS.get(element.tag)
+            if level:
+                while stack[-1][0] >= level:
+                    stack.pop()
+                section = etree.SubElement(stack[-1][1], "section")
+                section.append(element)
+                stack.append((level, section))
+            elif element.tag == "p":
+                stack[-1][1].extend(self._convert_to_list(element))
+            else:
+                stack[-1][1].append(element)
+
+    def _convert_to_list(self, paragraph):
+        """Return [paragraph] unchanged, or the elements replacing a bullet-line paragraph."""
+        text = paragraph.text or ""
+        if "\n" not in text and not _BULLET.match(text):
+            return [paragraph]
+
+        lines = text.strip().split("\n")
+        first_bullet = next((i for i, line in enumerate(lines) if _BULLET.match(line)), None)
+        if first_bullet is None:
+            return [paragraph]
+
+        elements = []
+        if first_bullet:
+            intro = etree.Element("p")
+            intro.text = "\n".join(lines[:first_bullet])
+            elements.append(intro)
+
+        new_list = etree.Element("ul" if _BULLET.match(lines[first_bullet]).group(1) else "ol")
+        item = None
+        for line in lines[first_bullet:]:
+            match = _BULLET.match(line)
+            if match:
+                item = etree.SubElement(new_list, "li")
+                item.text = line[match.end():].strip()
+            elif line.strip():
+                # Continuation of the previous item
+                item.text = f"{item.text} {line.strip()}"
+        new_list.tail = paragraph.tail
+        elements.append(new_list)
+        return elements
+
+
+class ReportStructureExtension(Extension):
+    """Markdown extension applying ReportStructureTreeprocessor to the parsed block tree."""
+
+    def extendMarkdown(self, md):
+        # Run before inline patterns (priority 20) so list items still hold raw
+        # markdown and keep their emphasis and links once inline parsing runs
+        md.treeprocessors.register(ReportStructureTreeprocessor(md), "report_structure", 25)
@@ -0,0 +1,204 @@
+import asyncio
+import email.utils
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import CONFIG
+from src import instrumentation
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second with bursts of `burst`.
+
+    acquire() blocks the calling thread; acquire_async() waits on the event loop.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token and return 0, or return the seconds until one will be available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds spent waiting."""
+        waited = 0.0
+        while self.rate:
+            delay = self._take()
+            if not delay:
+                break
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+    async def acquire_async(self):
+        waited = 0.0
+        while self.rate:
+            delay = self._take()
+            if not delay:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        return waited
+
+
+class DomainRateLimiter:
+    """One TokenBucket per host, with per-host overrides of the default rate."""
+
+    def __init__(self, default_rate, overrides=None):
+        self.default_rate = default_rate
+        self.overrides = overrides or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.overrides.get(host, self.default_rate))
+            return bucket
+
+    def acquire(self, url):
+        waited = self._bucket(url).acquire()
+        if waited:
+            instrumentation.count("rate_limit_wait_seconds", waited)
+
+    async def acquire_async(self, url):
+        waited = await self._bucket(url).acquire_async()
+        if waited:
+            instrumentation.count("rate_limit_wait_seconds", waited)
+
+
+def retry_after_seconds(response):
+    """Seconds requested by a Retry-After header (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Retry and per-domain rate-limit settings shared by HTTPSession and AsyncHTTPSession."""
+
+    def __init__(self, max_retries=None, retry_delay=None, rate_limiter=None):
+        self.max_retries = CONFIG.get("MAX_RETRIES", 3) if max_retries is None else max_retries
+        self.retry_delay = CONFIG.get("RETRY_DELAY", 2) if retry_delay is None else retry_delay
+        self.max_backoff = CONFIG.get("MAX_BACKOFF", 30)
+        self.rate_limiter = rate_limiter or DomainRateLimiter(
+            CONFIG.get("DOMAIN_RATE", 2), CONFIG.get("DOMAIN_RATE_OVERRIDES", {}))
+
+    def _backoff(self, attempt, response=None):
+        retry_after = retry_after_seconds(response)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.retry_delay * 2 ** attempt))
+
+    def _retry_delay(self, url, attempt, response=None, error=None):
+        """Seconds to wait before retrying url, or None when the response (or error) is final."""
+        if attempt >= self.max_retries or (error is None and response.status_code not in RETRY_STATUSES):
+            return None
+        delay = self._backoff(attempt, response)
+        reason = f"error: {str(error)}" if error is not None else f"HTTP {response.status_code}"
+        logger.warning(f"Retrying {url} in {delay:.1f}s after {reason}")
+        instrumentation.count("http_retries")
+        return delay
+
+
+class HTTPSession(RetryPolicy):
+    """Connection-pooled requests session with retries and per-domain rate limiting.
+
+    Connections are kept alive and reused across threads. Connection errors,
+    timeouts and 429/5xx responses are retried up to max_retries times with
+    exponential backoff and full jitter, honouring Retry-After when present.
+    """
+
+    def __init__(self, pool_size=None, max_retries=None, retry_delay=None, rate_limiter=None):
+        super().__init__(max_retries, retry_delay, rate_limiter)
+
+        pool_size = pool_size or CONFIG.get("HTTP_POOL_SIZE", 32)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, **kwargs):
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(url)
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self._retry_delay(url, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(url, attempt, response)
+                if delay is None:
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPSession(RetryPolicy):
+    """HTTPSession's retry and rate-limit policy over a shared httpx.AsyncClient."""
+
+    def __init__(self, client, max_retries=None, retry_delay=None, rate_limiter=None):
+        super().__init__(max_retries, retry_delay, rate_limiter)
+        self.client = client
+
+    async def get(self, url, **kwargs):
+        """GET url with its body unread; the caller must aclose() the response."""
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire_async(url)
+            try:
+                request = self.client.build_request("GET", url, **kwargs)
+                response = await self.client.send(request, stream=True, follow_redirects=True)
+            except httpx.TransportError as e:
+                delay = self._retry_delay(url, attempt, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(url, attempt, response)
+                if delay is None:
+                    return response
+                await response.aclose()
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -0,0 +1,172 @@
+import contextvars
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from config import CONFIG
+from src.fileutil import atomic_write
+
+_current_tracer = contextvars.ContextVar("tracer", default=None)
+
+
+class Tracer:
+    """Collects timed spans and counters for one research run.
+
+    Spans are flat records (name, start offset, duration, attributes); counters
+    accumulate totals such as bytes fetched, tokens used and cache hits. The
+    tracer is thread-safe so worker threads can report into it.
+    """
+
+    def __init__(self, run=None):
+        self.run = run
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the enclosed block; the yielded dict can be updated with extra attributes."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = str(e)
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, start=start, **attrs)
+
+    def record(self, name, duration, start=None, **attrs):
+        """Record a span whose duration was measured by the caller."""
+        start = time.perf_counter() - duration if start is None else start
+        span = {"name": name, "start": round(start - self._start, 6), "duration": round(duration, 6), **attrs}
+        with self._lock:
+            self.spans.append(span)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def stage_stats(self):
+        """Per-span-name count, total, p50 and p95 durations in seconds."""
+        durations = defaultdict(list)
+        with self._lock:
+            for span in self.spans:
+                durations[span["name"]].append(span["duration"])
+        return {name: _summarize(values) for name, values in durations.items()}
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {
+            "run": self.run,
+            "started_at": self.started_at,
+            "elapsed": round(time.perf_counter() - self._start, 6),
+            "stages": self.stage_stats(),
+            "counters": counters,
+            "spans": spans,
+        }
+
+    def write_json(self, path):
+        atomic_write(path, json.dumps(self.to_dict(), indent=2))
+
+    def prometheus_text(self):
+        """Render stage timings and counters in the Prometheus text exposition format."""
+        lines = [
+            "# HELP research_stage_seconds Time spent in each pipeline stage.",
+            "# TYPE research_stage_seconds summary",
+        ]
+        for name, stats in sorted(self.stage_stats().items()):
+            label = f'stage="{name}"'
+            lines.append(f'research_stage_seconds{{{label},quantile="0.5"}} {stats["p50"]}')
+            lines.append(f'research_stage_seconds{{{label},quantile="0.95"}} {stats["p95"]}')
+            lines.append(f"research_stage_seconds_sum{{{label}}} {stats['total']}")
+            lines.append(f"research_stage_seconds_count{{{label}}} {stats['count']}")
+        with self._lock:
+            counters = sorted(self.counters.items())
+        for name, value in counters:
+            metric = "research_" + re.sub(r"[^a-zA-Z0-9_]", "_", name) + "_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        atomic_write(path, self.prometheus_text())
+
+
+def _summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total": round(sum(values), 6),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+    }
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def export_trace(tracer, basename, directory=None):
+    """Write tracer as <basename>_trace.json (and .prom if enabled) under directory or CONFIG["TRACE_DIR"]."""
+    if not CONFIG.get("TRACE_ENABLED", True):
+        return None
+    path = os.path.join(directory or CONFIG.get("TRACE_DIR", "debug"), f"{basename}_trace.json")
+    tracer.write_json(path)
+    if CONFIG.get("TRACE_PROMETHEUS", False):
+        tracer.write_prometheus(os.path.splitext(path)[0] + ".prom")
+    return path
+
+
+def current_tracer():
+    return _current_tracer.get()
+
+
+@contextmanager
+def use_tracer(tracer):
+    """Make tracer the one that span()/count() report to within this context."""
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block against the current tracer; a no-op when no tracer is active."""
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield attrs
+        return
+    with tracer.span(name, **attrs) as span_attrs:
+        yield span_attrs
+
+
+def record(name, duration, **attrs):
+    tracer = _current_tracer.get()
+    if tracer is not None:
+        tracer.record(name, duration, **attrs)
+
+
+def count(name, value=1):
+    tracer = _current_tracer.get()
+    if tracer is not None:
+        tracer.count(name, value)
+
+
+def propagate(fn):
+    """Wrap fn so calls on worker threads report to the caller's tracer."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
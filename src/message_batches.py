@@ -0,0 +1,248 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import CONFIG
+from src import instrumentation
+from src.checkpoint import new_run_id
+from src.dedup import PageDeduplicator
+from src.instrumentation import Tracer, export_trace, propagate, use_tracer
+from src.run_output import RunOutput, use_run
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatchRunner:
+    """Sends many prompts of one stage through the Message Batches API.
+
+    Prompts already in the LLM cache are answered from it; the rest are
+    submitted in batches of at most max_requests, polled with exponential
+    backoff until they end and mapped back by custom_id. Responses are logged,
+    cached and counted exactly like AIModelInterface.generate_response; failed
+    requests are logged and counted like its errors but returned separately,
+    so callers can fail their runs instead of building on error text.
+    """
+
+    def __init__(self, ai_model, poll_interval=None, max_poll_interval=None, timeout=None, max_requests=None):
+        self.ai_model = ai_model
+        self.poll_interval = poll_interval or CONFIG.get("LLM_BATCH_POLL_INTERVAL", 10)
+        self.max_poll_interval = max_poll_interval or CONFIG.get("LLM_BATCH_MAX_POLL_INTERVAL", 120)
+        self.timeout = timeout or CONFIG.get("LLM_BATCH_TIMEOUT", 24 * 3600)
+        self.max_requests = max_requests or CONFIG.get("LLM_BATCH_MAX_REQUESTS", 10000)
+
+    def run(self, stage, requests):
+        """Answer requests, a dict of custom_id to (prompt, max_tokens).
+
+        Returns (responses, errors): custom_id to response text for the
+        requests that succeeded and custom_id to error message for the rest.
+        """
+        responses = {}
+        errors = {}
+        pending = {}
+        for custom_id, (prompt, max_tokens) in requests.items():
+            self.ai_model.conversation_logger.log_interaction("user", prompt)
+            cached = self.ai_model._cached_response(prompt, max_tokens, {})
+            if cached is not None:
+                responses[custom_id] = cached
+            else:
+                pending[custom_id] = (prompt, max_tokens)
+
+        custom_ids = list(pending)
+        for start in range(0, len(custom_ids), self.max_requests):
+            chunk = {custom_id: pending[custom_id] for custom_id in custom_ids[start:start + self.max_requests]}
+            with instrumentation.span(f"llm_batch.{stage}", requests=len(chunk)) as attrs:
+                self._run_batch(chunk, attrs, responses, errors)
+        return responses, errors
+
+    def _run_batch(self, requests, attrs, responses, errors):
+        batches = self.ai_model.anthropic.messages.batches
+        try:
+            batch = batches.create(requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": self.ai_model._message_params(prompt, max_tokens),
+                }
+                for custom_id, (prompt, max_tokens) in requests.items()
+            ])
+            attrs["batch_id"] = batch.id
+            logger.info(f"Submitted message batch {batch.id} with {len(requests)} requests")
+            instrumentation.count("llm_batches")
+
+            self._wait(batch)
+
+            for entry in batches.results(batch.id):
+                if entry.custom_id not in requests:
+                    continue
+                prompt, max_tokens = requests[entry.custom_id]
+                if entry.result.type == "succeeded":
+                    responses[entry.custom_id] = self.ai_model._handle_response(
+                        prompt, max_tokens, entry.result.message, {})
+                else:
+                    error = getattr(entry.result, "error", None) or entry.result.type
+                    errors[entry.custom_id] = self.ai_model._handle_error(
+                        RuntimeError(f"batch request {entry.result.type}: {error}"), {})
+        except Exception as e:
+            message = self.ai_model._handle_error(e, attrs)
+            for custom_id in requests:
+                if custom_id not in responses:
+                    errors[custom_id] = message
+            return
+
+        for custom_id in requests:
+            if custom_id not in responses and custom_id not in errors:
+                errors[custom_id] = self.ai_model._handle_error(RuntimeError("no result returned by batch"), {})
+
+    def _wait(self, batch):
+        """Poll until batch ends, backing off between polls; cancel it if timeout passes."""
+        batches = self.ai_model.anthropic.messages.batches
+        deadline = time.monotonic() + self.timeout
+        interval = self.poll_interval
+        while batch.processing_status != "ended":
+            if time.monotonic() >= deadline:
+                logger.warning(f"Message batch {batch.id} timed out; cancelling it")
+                batches.cancel(batch.id)
+                deadline = float("inf")
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+            batch = batches.retrieve(batch.id)
+            logger.debug(f"Message batch {batch.id}: {batch.processing_status}")
+        return batch
+
+
+class _TopicRun:
+    __slots__ = ("topic", "output", "started_at", "dedup", "research_data", "initial_report",
+                 "followup_questions", "additional_research_data", "report", "error")
+
+    def __init__(self, topic):
+        self.topic = topic
+        self.output = RunOutput(new_run_id(topic))
+        self.started_at = datetime.now().isoformat()
+        self.dedup = PageDeduplicator(CONFIG.get("CONTENT_DEDUP_DISTANCE", 3))
+        self.research_data = None
+        self.initial_report = None
+        self.followup_questions = None
+        self.additional_research_data = None
+        self.report = None
+        self.error = None
+
+
+def _each(runs, fn, workers):
+    """Apply fn to every run that has not failed, on a thread pool, recording exceptions on the run."""
+    def guarded(run):
+        try:
+            with use_run(run.output):
+                fn(run)
+        except Exception as e:
+            logger.error(f"Research on '{run.topic}' failed: {str(e)}")
+            run.error = str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(propagate(guarded), [run for run in runs if run.error is None]))
+
+
+def _llm_stage(runner, runs, attribute, make_steps):
+    """Drive the ReportGenerator stage make_steps(run) of every live run and store its result as attribute.
+
+    The stages advance in lockstep: each round of their LLM requests (e.g.
+    every gap analysis, then every question prompt) is sent as one batch. A
+    run whose request fails is marked failed and drops out of later stages.
+    """
+    steps = {index: make_steps(run) for index, run in enumerate(runs) if run.error is None}
+    responses = dict.fromkeys(steps)
+    while steps:
+        requests = {}
+        stage = None
+        for index in list(steps):
+            run = runs[index]
+            try:
+                with use_run(run.output):
+                    request = steps[index].send(responses[index])
+            except StopIteration as done:
+                setattr(run, attribute, done.value)
+                del steps[index]
+            except Exception as e:
+                logger.error(f"Research on '{run.topic}' failed: {str(e)}")
+                run.error = str(e)
+                del steps[index]
+            else:
+                requests[f"topic-{index}"] = (request.prompt, request.max_tokens)
+                stage = request.stage
+        if requests:
+            logger.info(f"Running stage '{stage}' for {len(requests)} topics as message batches")
+            answered, errors = runner.run(stage, requests)
+            for custom_id, response in answered.items():
+                responses[int(custom_id.split("-")[1])] = response
+            for custom_id, error in errors.items():
+                index = int(custom_id.split("-")[1])
+                run = runs[index]
+                logger.error(f"Research on '{run.topic}' failed: {error}")
+                run.error = f"An LLM request failed during stage '{stage}': {error}"
+                steps.pop(index).close()
+
+
+def run_message_batches(topics, researcher, out, workers=4, runner=None, tracer=None):
+    """Research topics stage by stage, sending each LLM stage for all topics as message batches.
+
+    Scraping and follow-up research still run on `workers` threads; every LLM
+    stage waits for the previous one to finish for all topics. Each topic
+    gets its own run directory, but the batched LLM calls are logged to the
+    shared conversation log. One JSON record
+    per topic is written to out at the end. Returns the number of topics that
+    failed.
+    """
+    runs = [_TopicRun(topic) for topic in topics]
+    runner = runner or MessageBatchRunner(researcher.ai_model)
+    generator = researcher.report_generator
+    tracer = tracer or Tracer(run="message_batches")
+    start = time.perf_counter()
+
+    with use_tracer(tracer):
+        def scrape(run):
+            run.research_data = researcher.scraper.search_and_scrape(run.topic, run.dedup)
+
+        def research_followups(run):
+            run.additional_research_data = researcher.research_followup_questions(run.followup_questions, run.dedup)
+
+        def write_report(run):
+            html_report = generator.generate_html_report(run.report, f"{run.topic} Research Report")
+            run.report = run.output.write("report.html", html_report)
+
+        with tracer.span("bulk.scrape", topics=len(runs)):
+            _each(runs, scrape, workers)
+
+        _llm_stage(runner, runs, "initial_report",
+                   lambda run: generator.initial_report_steps(run.topic, run.research_data))
+        _llm_stage(runner, runs, "followup_questions",
+                   lambda run: generator.followup_questions_steps(run.initial_report))
+
+        with tracer.span("bulk.followup_research", topics=len(runs)):
+            _each(runs, research_followups, workers)
+
+        _llm_stage(runner, runs, "report", lambda run: generator.enhancement_steps(
+            run.initial_report, run.followup_questions, run.additional_research_data))
+
+        with tracer.span("bulk.write_reports", topics=len(runs)):
+            _each(runs, write_report, workers)
+
+        trace_path = export_trace(tracer, "message_batches")
+    if trace_path:
+        logger.info(f"Run trace saved as {trace_path}")
+
+    elapsed = round(time.perf_counter() - start, 3)
+    failures = 0
+    for run in runs:
+        run.output.close()
+        record = {"topic": run.topic, "run_id": run.output.run_id, "started_at": run.started_at}
+        if run.error is None:
+            record["report"] = run.report
+            record["status"] = "ok"
+        else:
+            record["status"] = "error"
+            record["error"] = run.error
+            failures += 1
+        record["elapsed_seconds"] = elapsed
+        out.write(json.dumps(record) + "\n")
+    out.flush()
+    return failures
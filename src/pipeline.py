@@ -0,0 +1,52 @@
+import logging
+
+from src import instrumentation
+
+logger = logging.getLogger(__name__)
+
+
+class StagePipeline:
+    """Runs named stages in the order they were added.
+
+    Each stage function is called with the results of the earlier stages it
+    depends on as keyword arguments named after those stages. The stages of a
+    research run each need the previous one's output, so they run one after
+    another; the overlap within a run happens inside stages (e.g. follow-up
+    searches start while the questions are still streaming).
+
+    With a CheckpointStore, every finished stage's result is saved to it, and
+    a stage already saved there is loaded instead of run, as long as all its
+    dependencies were loaded too.
+    """
+
+    def __init__(self, checkpoints=None):
+        self.checkpoints = checkpoints
+        self._stages = []
+
+    def add(self, name, fn, deps=()):
+        known = {stage for stage, _, _ in self._stages}
+        unknown = [dep for dep in deps if dep not in known]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on stages not added before it: {unknown}")
+        self._stages.append((name, fn, tuple(deps)))
+        return self
+
+    def run(self):
+        """Run (or restore) every stage and return a dict of stage name to result."""
+        results = {}
+        restored = set()
+        for name, fn, deps in self._stages:
+            if self._restorable(name, deps, restored):
+                results[name] = self.checkpoints.load(name)
+                restored.add(name)
+                logger.info(f"Restored stage '{name}' from checkpoint")
+                continue
+            logger.debug(f"Starting stage '{name}'")
+            with instrumentation.span(f"stage.{name}"):
+                results[name] = fn(**{dep: results[dep] for dep in deps})
+            if self.checkpoints:
+                self.checkpoints.save(name, results[name])
+        return results
+
+    def _restorable(self, name, deps, restored):
+        return bool(self.checkpoints) and all(dep in restored for dep in deps) and self.checkpoints.has(name)
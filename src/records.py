@@ -0,0 +1,75 @@
+class PageResult:
+    """One scraped page; content is empty and error set when the page could not be scraped."""
+
+    __slots__ = ("url", "title", "content", "error")
+
+    def __init__(self, url, title="", content="", error=None):
+        self.url = url
+        self.title = title
+        self.content = content
+        self.error = error
+
+    @classmethod
+    def failed(cls, url, error):
+        return cls(url, error=str(error))
+
+    def __repr__(self):
+        return f"PageResult(url={self.url!r}, title={self.title!r}, chars={len(self.content)}, error={self.error!r})"
+
+
+class QuestionResearch:
+    """A follow-up question and the IDs of the pages found for it in a ResearchData store."""
+
+    __slots__ = ("question", "page_ids")
+
+    def __init__(self, question, page_ids=()):
+        self.question = question
+        self.page_ids = tuple(page_ids)
+
+    def __repr__(self):
+        return f"QuestionResearch(question={self.question!r}, page_ids={self.page_ids!r})"
+
+
+class ResearchData:
+    """Follow-up research of one run, holding each page once and questions referring to pages by ID.
+
+    A page found for several questions is stored (and later quoted in a prompt)
+    only once; page IDs are positions in `pages`.
+    """
+
+    __slots__ = ("pages", "questions", "_ids")
+
+    def __init__(self):
+        self.pages = []
+        self.questions = []
+        self._ids = {}
+
+    def add_page(self, page):
+        """Store page unless it is already stored and return its ID."""
+        page_id = self._ids.get(id(page))
+        if page_id is None:
+            page_id = self._ids[id(page)] = len(self.pages)
+            self.pages.append(page)
+        return page_id
+
+    def add_question(self, question, pages):
+        item = QuestionResearch(question, [self.add_page(page) for page in pages])
+        self.questions.append(item)
+        return item
+
+    def pages_for(self, item):
+        return [self.pages[page_id] for page_id in item.page_ids]
+
+    def __getstate__(self):
+        # _ids is keyed by object identity, which does not survive pickling
+        return self.pages, self.questions
+
+    def __setstate__(self, state):
+        self.pages, self.questions = state
+        self._ids = {id(page): page_id for page_id, page in enumerate(self.pages)}
+
+    def __iter__(self):
+        return iter(self.questions)
+
+    def __len__(self):
+        return len(self.questions)
@@ -1,123 +1,346 @@
 import logging
 import markdown
 from datetime import datetime
+import hashlib
+import json
 import os
-import re
-from bs4 import BeautifulSoup
+import time
 from config import CONFIG
 from anthropic import Anthropic
 from src.conversation_logger import ConversationLogger
+from src.cache import DiskCache
+from src import instrumentation, run_output
+from src.context_packer import ContextPacker
+from src.html_structure import ReportStructureExtension
 
 logger = logging.getLogger(__name__)
 
+
+class LLMRequest:
+    """One LLM call a report stage needs; stream marks responses worth showing as they arrive."""
+
+    __slots__ = ("prompt", "max_tokens", "stage", "stream")
+
+    def __init__(self, prompt, max_tokens, stage, stream=False):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.stage = stage
+        self.stream = stream
+
+
+class LLMError(RuntimeError):
+    """An LLM request that failed, raised so its error never stands in for a response."""
+
+    def __init__(self, stage, message):
+        super().__init__(f"LLM request '{stage}' failed: {message}")
+        self.stage = stage
+
+
 class AIModelInterface:
-    def __init__(self):
-        self.anthropic = Anthropic(api_key=CONFIG["ANTHROPIC_API_KEY"])
+    def __init__(self, client=None, use_cache=None):
+        self.anthropic = client or Anthropic(api_key=CONFIG["ANTHROPIC_API_KEY"])
         self.model = "claude-3-haiku-20240307"
-        self.conversation_logger = ConversationLogger("debug/conversation_log.json")
+        self._conversation_logger = ConversationLogger(
+            CONFIG.get("CONVERSATION_LOG_PATH", "debug/conversation_log.jsonl"),
+            flush_every=CONFIG.get("CONVERSATION_LOG_FLUSH_EVERY", 20),
+            flush_interval=CONFIG.get("CONVERSATION_LOG_FLUSH_INTERVAL", 5.0),
+        )
+
+        if use_cache is None:
+            use_cache = CONFIG.get("LLM_CACHE_ENABLED", True)
+        self.cache = DiskCache(
+            os.path.join(CONFIG.get("CACHE_DIR", "cache"), "llm.sqlite3"),
+            ttl=CONFIG.get("LLM_CACHE_TTL", 7 * 86400),
+            max_bytes=CONFIG.get("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024),
+            name="llm",
+        ) if use_cache else None
+
+    @property
+    def conversation_logger(self):
+        """The conversation log of the current run, or the shared one outside a run."""
+        run = run_output.current_run()
+        return run.conversation_logger if run else self._conversation_logger
+
+    def _message_params(self, prompt, max_tokens):
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+        }
 
-    def generate_response(self, prompt, max_tokens=2000):
-        try:
-            self.conversation_logger.log_interaction("user", prompt)
-            
-            response = self.anthropic.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            
-            ai_response = response.content[0].text
-            self.conversation_logger.log_interaction("assistant", ai_response)
-            
-            return ai_response
-        except Exception as e:
-            error_message = f"Error generating response: {str(e)}"
-            logger.error(error_message)
-            self.conversation_logger.log_interaction("system", error_message)
-            return error_message
+    def _cache_key(self, prompt, max_tokens):
+        payload = json.dumps([self.model, max_tokens, prompt])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cached_response(self, prompt, max_tokens, attrs):
+        """Return the memoized response for this prompt, or None on a cache miss."""
+        attrs["cache"] = "off"
+        if not self.cache:
+            return None
+        cached = self.cache.get(self._cache_key(prompt, max_tokens))
+        if not (cached and cached.fresh):
+            attrs["cache"] = "miss"
+            return None
+        attrs["cache"] = "hit"
+        logger.info("Serving response from LLM cache")
+        self.conversation_logger.log_interaction("assistant", cached.value)
+        return cached.value
+
+    def _handle_response(self, prompt, max_tokens, response, attrs):
+        ai_response = response.content[0].text
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            attrs["input_tokens"] = usage.input_tokens
+            attrs["output_tokens"] = usage.output_tokens
+            instrumentation.count("input_tokens", usage.input_tokens)
+            instrumentation.count("output_tokens", usage.output_tokens)
+        if self.cache:
+            self.cache.set(self._cache_key(prompt, max_tokens), ai_response)
+        self.conversation_logger.log_interaction("assistant", ai_response)
+        return ai_response
+
+    def _handle_error(self, error, attrs):
+        error_message = f"Error generating response: {str(error)}"
+        logger.error(error_message)
+        attrs["error"] = str(error)
+        instrumentation.count("llm_errors")
+        self.conversation_logger.log_interaction("system", error_message)
+        return error_message
+
+    def generate_response(self, prompt, max_tokens=2000, stage="response"):
+        """Return the response text for prompt; raises LLMError (after logging and counting it) on failure."""
+        with instrumentation.span(f"llm.{stage}", max_tokens=max_tokens) as attrs:
+            try:
+                self.conversation_logger.log_interaction("user", prompt)
+
+                cached = self._cached_response(prompt, max_tokens, attrs)
+                if cached is not None:
+                    return cached
+
+                response = self.anthropic.messages.create(**self._message_params(prompt, max_tokens))
+
+                return self._handle_response(prompt, max_tokens, response, attrs)
+            except Exception as e:
+                self._handle_error(e, attrs)
+                raise LLMError(stage, str(e)) from e
+
+    def stream_response(self, prompt, max_tokens=2000, stage="response"):
+        """Yield the response text in chunks as the API streams it.
+
+        Cached responses are yielded in one piece. The complete response is
+        logged and cached once the stream finishes. Failures raise LLMError,
+        like generate_response.
+        """
+        with instrumentation.span(f"llm.{stage}", max_tokens=max_tokens, streamed=True) as attrs:
+            try:
+                self.conversation_logger.log_interaction("user", prompt)
+
+                cached = self._cached_response(prompt, max_tokens, attrs)
+                if cached is not None:
+                    yield cached
+                    return
+
+                start = time.perf_counter()
+                with self.anthropic.messages.stream(**self._message_params(prompt, max_tokens)) as stream:
+                    for text in stream.text_stream:
+                        if "time_to_first_token" not in attrs:
+                            attrs["time_to_first_token"] = round(time.perf_counter() - start, 6)
+                        yield text
+                    response = stream.get_final_message()
+
+                self._handle_response(prompt, max_tokens, response, attrs)
+            except Exception as e:
+                self._handle_error(e, attrs)
+                raise LLMError(stage, str(e)) from e
+
+class IncrementalHTMLWriter:
+    """Writes an HTML report section by section while its markdown is still arriving.
+
+    Markdown fed in is buffered until a new heading starts; every completed
+    section is then rendered and flushed to <path>.part, so the report can be
+    opened before generation finishes. Sections rendered on their own can't
+    resolve reference-style links defined elsewhere or nest into the sections
+    around them, so once the report is complete the whole markdown is rendered
+    again, exactly as generate_html_report would, and only that is renamed to
+    path.
+    """
+
+    def __init__(self, path, title, report_generator):
+        self.path = path
+        self.partial_path = f"{path}.part"
+        self.title = title
+        self.report_generator = report_generator
+        self._pending = ""
+        self._markdown = []
+        self._file = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._file is not None:
+            # Leave what was written in the .part file rather than passing it off as the report
+            self._file.close()
+            self._file = None
+
+    def open(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.partial_path, 'w')
+        self._write(self.report_generator._html_document_start(self.title))
+
+    def feed(self, markdown_text):
+        self._markdown.append(markdown_text)
+        self._pending += markdown_text
+        split_at = self._last_section_boundary()
+        if split_at:
+            self._render(self._pending[:split_at])
+            self._pending = self._pending[split_at:]
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._pending = ""
+        html_report = self.report_generator.generate_html_report("".join(self._markdown), self.title)
+        with open(self.partial_path, 'w') as f:
+            f.write(html_report)
+        os.replace(self.partial_path, self.path)
+        logger.info(f"HTML report written incrementally to {self.path}")
+
+    def _last_section_boundary(self):
+        """Offset of the last heading that starts a new section, outside code fences."""
+        boundary = 0
+        in_fence = False
+        offset = 0
+        for line in self._pending.splitlines(keepends=True):
+            if not line.endswith("\n"):
+                break  # incomplete line; wait for the rest
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+            elif line.startswith("#") and not in_fence and offset:
+                boundary = offset
+            offset += len(line)
+        return boundary
+
+    def _render(self, markdown_text):
+        with instrumentation.span("render_html_section"):
+            self._write(self.report_generator._markdown_to_html(markdown_text))
+
+    def _write(self, text):
+        self._file.write(text)
+        self._file.flush()
 
 class ReportGenerator:
+    """Builds the reports of a research run with an AIModelInterface.
+
+    Each LLM stage (initial report, follow-up questions, enhancement) is
+    written once as a generator that yields LLMRequests and is sent their
+    responses, returning the stage's result. run_stage() answers them with
+    blocking calls and stream_stage() streams the requests marked stream;
+    AsyncResearcher and the message-batch runner drive the same generators.
+    """
+
     def __init__(self, ai_model):
         self.ai_model = ai_model
 
-    def generate_initial_report(self, topic, research_data):
+    def run_stage(self, steps):
+        """Drive a stage generator with blocking LLM calls and return its result."""
+        response = None
+        try:
+            while True:
+                request = steps.send(response)
+                response = self.ai_model.generate_response(request.prompt, request.max_tokens, request.stage)
+        except StopIteration as done:
+            return done.value
+
+    def stream_stage(self, steps):
+        """Drive a stage generator, yielding the text of its streamed requests as it arrives."""
+        response = None
+        try:
+            while True:
+                request = steps.send(response)
+                if not request.stream:
+                    response = self.ai_model.generate_response(request.prompt, request.max_tokens, request.stage)
+                    continue
+                parts = []
+                for chunk in self.ai_model.stream_response(request.prompt, request.max_tokens, request.stage):
+                    parts.append(chunk)
+                    yield chunk
+                response = "".join(parts)
+        except StopIteration:
+            return
+
+    def initial_report_steps(self, topic, research_data):
         logger.info(f"Generating initial report for topic: {topic}")
         
         research_summary = self._prepare_research_summary(topic, research_data)
         initial_report_prompt = self._create_initial_report_prompt(topic, research_summary)
         
-        initial_content = self.ai_model.generate_response(initial_report_prompt, max_tokens=2000)
+        initial_content = yield LLMRequest(initial_report_prompt, 2000, "initial_report")
         logger.info("Initial report generation completed successfully")
         return initial_content
 
-    def _analyze_information_gaps(self, initial_report):
-        logger.info("Analyzing information gaps using LLM")
-        
-        analysis_prompt = f"""
-        Analyze the following report for information gaps, missing details, or areas that need more specific examples or evidence:
-
-        {initial_report}
-
-        Please identify at least 3 and up to 5 specific areas where the report could be improved. For each area, provide:
-        1. The section or topic that needs improvement
-        2. What kind of information is missing (e.g., specific examples, dates, data, expert opinions, comparisons)
-        3. Why this information would be valuable to include
-
-        Format your response as a list, with each item clearly stating the section and the type of information needed.
-        """
-
-        analysis_response = self.ai_model.generate_response(analysis_prompt, max_tokens=1000)
-        
-        # Parse the response into a list of gaps
-        gaps = [line.strip() for line in analysis_response.split('\n') if line.strip()]
-        
-        logger.info(f"Identified {len(gaps)} information gaps")
-        return gaps
-
-    def generate_followup_questions(self, initial_report):
+    def followup_questions_steps(self, initial_report):
         logger.info("Generating follow-up questions")
         
-        gaps = self._analyze_information_gaps(initial_report)
+        if CONFIG.get("MERGE_GAP_ANALYSIS", False):
+            # One LLM call instead of gap analysis followed by question generation
+            questions_prompt = self._create_followup_prompt(initial_report)
+        else:
+            logger.info("Analyzing information gaps using LLM")
+            analysis_response = yield LLMRequest(self._create_gap_analysis_prompt(initial_report), 1000, "gap_analysis")
+            gaps = self._parse_gaps(analysis_response)
+            logger.info(f"Identified {len(gaps)} information gaps")
+            questions_prompt = self._create_questions_prompt(gaps)
+
+        questions = yield LLMRequest(questions_prompt, 1000, "questions", stream=True)
         
-        questions_prompt = f"""
-        Based on the following analysis of information gaps in a report, generate 3 specific follow-up questions:
-
-        Information gaps:
-        {gaps}
-
-        Generate questions that will help fill these gaps with more specific information, examples, or details. Each question should be clear, focused, and designed to elicit detailed responses.
-
-        Return only the questions, one per line, numbered 1-3.
-        """
-
-        questions = self.ai_model.generate_response(questions_prompt, max_tokens=1000)
-        
-        os.makedirs("debug", exist_ok=True)
-        with open('debug/questions.txt', 'w') as f:
-            f.write(questions)
+        self._save_questions(questions)
         logger.info("Follow-up questions generated successfully")
         return questions
 
-    def enhance_report(self, initial_report, followup_questions, additional_research_data=None):
+    def enhancement_steps(self, initial_report, followup_questions, additional_research_data=None):
         logger.info("Enhancing report with follow-up questions and additional research")
         
         enhancement_prompt = self._create_enhancement_prompt(initial_report, followup_questions, additional_research_data)
-        enhanced_content = self.ai_model.generate_response(enhancement_prompt, max_tokens=3000)
+        enhanced_content = yield LLMRequest(enhancement_prompt, 3000, "enhancement", stream=True)
         logger.info("Report enhancement completed successfully")
         return enhanced_content
 
+    def generate_initial_report(self, topic, research_data):
+        return self.run_stage(self.initial_report_steps(topic, research_data))
+
+    def generate_followup_questions(self, initial_report):
+        return self.run_stage(self.followup_questions_steps(initial_report))
+
+    def stream_followup_questions(self, initial_report):
+        """Like generate_followup_questions, but yields the questions text in chunks as it is generated."""
+        return self.stream_stage(self.followup_questions_steps(initial_report))
+
+    def enhance_report(self, initial_report, followup_questions, additional_research_data=None):
+        return self.run_stage(self.enhancement_steps(initial_report, followup_questions, additional_research_data))
+
+    def stream_enhanced_report(self, initial_report, followup_questions, additional_research_data=None):
+        """Like enhance_report, but yields the enhanced markdown in chunks as it is generated."""
+        return self.stream_stage(self.enhancement_steps(initial_report, followup_questions, additional_research_data))
+
     def generate_html_report(self, markdown_content, title):
         logger.info(f"Generating HTML report: {title}")
         
         try:
-            html_content = markdown.markdown(markdown_content, extensions=['extra'])
-            improved_html = self._improve_html_structure(html_content)
-            html_template = self._create_html_template(title, improved_html)
+            with instrumentation.span("render_html"):
+                html_content = self._markdown_to_html(markdown_content)
+                html_template = self._create_html_template(title, html_content)
             
             logger.info("HTML report generated successfully")
             return html_template
@@ -125,18 +348,28 @@ class ReportGenerator:
             logger.error(f"Error generating HTML report: {str(e)}")
             return f"<html><body><h1>Error</h1><p>Error generating HTML report: {str(e)}</p></body></html>"
 
+    def _pack_contents(self, query, results, token_budget, packer=None):
+        """Excerpts of each result's content packed into token_budget, or the raw content if packing is off."""
+        contents = [result.content if not result.error else "" for result in results]
+        if not CONFIG.get("CONTEXT_PACKING", True):
+            return contents
+        packer = packer or ContextPacker(dedup_threshold=CONFIG.get("DEDUP_THRESHOLD", 0.8))
+        with instrumentation.span("pack_context", sources=len(results)):
+            return packer.pack(query, contents, token_budget)
+
     def _prepare_research_summary(self, topic, research_data):
-        research_summary = f"# Research Summary for: {topic}\n\n"
-        for result in research_data:
-            research_summary += f"## Source: {result['url']}\n\n"
-            if result['error']:
-                research_summary += f"Error: {result['error']}\n\n"
+        excerpts = self._pack_contents(topic, research_data, CONFIG.get("INITIAL_CONTEXT_TOKENS", 6000))
+        parts = [f"# Research Summary for: {topic}\n\n"]
+        for result, excerpt in zip(research_data, excerpts):
+            if not result.error and not excerpt:
+                continue
+            parts.append(f"## Source: {result.url}\n\n")
+            if result.error:
+                parts.append(f"Error: {result.error}\n\n")
             else:
-                research_summary += f"### Title: {result['title']}\n\n"
-                research_summary += "### Content Excerpt:\n"
-                research_summary += f"{result['content']}...\n\n" 
-            research_summary += "---\n\n"
-        return research_summary
+                parts.append(f"### Title: {result.title}\n\n### Content Excerpt:\n{excerpt}...\n\n")
+            parts.append("---\n\n")
+        return "".join(parts)
 
     def _create_initial_report_prompt(self, topic, research_summary):
         return f"""
@@ -163,6 +396,39 @@ class ReportGenerator:
         informative, and engaging report that best represents the research findings on {topic}.
         """
 
+    def _create_gap_analysis_prompt(self, initial_report):
+        return f"""
+        Analyze the following report for information gaps, missing details, or areas that need more specific examples or evidence:
+
+        {initial_report}
+
+        Please identify at least 3 and up to 5 specific areas where the report could be improved. For each area, provide:
+        1. The section or topic that needs improvement
+        2. What kind of information is missing (e.g., specific examples, dates, data, expert opinions, comparisons)
+        3. Why this information would be valuable to include
+
+        Format your response as a list, with each item clearly stating the section and the type of information needed.
+        """
+
+    def _parse_gaps(self, analysis_response):
+        # Parse the response into a list of gaps
+        return [line.strip() for line in analysis_response.split('\n') if line.strip()]
+
+    def _create_questions_prompt(self, gaps):
+        return f"""
+        Based on the following analysis of information gaps in a report, generate 3 specific follow-up questions:
+
+        Information gaps:
+        {gaps}
+
+        Generate questions that will help fill these gaps with more specific information, examples, or details. Each question should be clear, focused, and designed to elicit detailed responses.
+
+        Return only the questions, one per line, numbered 1-3.
+        """
+
+    def _save_questions(self, questions):
+        run_output.debug("questions.txt", questions)
+
     def _create_followup_prompt(self, initial_report):
         return f"""
         Based on the following initial report, generate 3 follow-up questions that would elicit more specific information, examples, or details:
@@ -193,59 +459,40 @@ class ReportGenerator:
         """
 
     def _format_additional_research(self, additional_research_data):
-        formatted_data = ""
+        """Format a ResearchData store, quoting each page once and citing it by ID after that."""
+        # One packer across questions so a passage already quoted for one question is not repeated
+        packer = ContextPacker(dedup_threshold=CONFIG.get("DEDUP_THRESHOLD", 0.8))
+        budget = CONFIG.get("FOLLOWUP_CONTEXT_TOKENS", 6000) // max(len(additional_research_data), 1)
+        pages = additional_research_data.pages
+        quoted = set()
+        parts = []
         for item in additional_research_data:
-            formatted_data += f"Question: {item['question']}\n"
-            for result in item['data']:
-                formatted_data += f"Source: {result['url']}\n"
-                formatted_data += "Content Excerpts:\n"
-                formatted_data += f"- {result['content']}\n"
-                formatted_data += f"Error: {result['error']}\n" if result['error'] else ""
-            formatted_data += "\n"
-        return formatted_data
-
-    def _improve_html_structure(self, html_content):
-        soup = BeautifulSoup(html_content, 'html.parser')
-        self._convert_to_list(soup)
-        self._wrap_sections(soup)
-        return str(soup)
-
-    def _convert_to_list(self, soup):
-        bullet_point_patterns = [
-            r'^\s*[-•]\s',  # Matches lines starting with - or •
-            r'^\s*\d+\.\s',  # Matches lines starting with numbers followed by a period
-        ]
-        
-        for p in soup.find_all('p'):
-            text = p.text.strip()
-            lines = text.split('\n')
-            
-            if any(re.match(pattern, line) for pattern in bullet_point_patterns for line in lines):
-                new_list = soup.new_tag('ul' if re.match(bullet_point_patterns[0], lines[0]) else 'ol')
-                
-                for line in lines:
-                    if any(re.match(pattern, line) for pattern in bullet_point_patterns):
-                        li = soup.new_tag('li')
-                        li.string = re.sub(r'^\s*[-•\d.]\s', '', line).strip()
-                        new_list.append(li)
-                
-                p.replace_with(new_list)
-
-    def _wrap_sections(self, soup):
-        headers = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-        
-        for i in range(len(headers)):
-            section = soup.new_tag('section')
-            headers[i].wrap(section)
-            
-            next_sibling = headers[i].next_sibling
-            while next_sibling and (next_sibling.name not in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6'] or 
-                                    (next_sibling.name == headers[i].name and i < len(headers) - 1)):
-                next_element = next_sibling.next_sibling
-                section.append(next_sibling)
-                next_sibling = next_element
+            new_ids = [page_id for page_id in item.page_ids if page_id not in quoted]
+            excerpts = dict(zip(new_ids, self._pack_contents(item.question, [pages[i] for i in new_ids], budget, packer)))
+            parts.append(f"Question: {item.question}\n")
+            for page_id in item.page_ids:
+                result = pages[page_id]
+                if page_id in quoted:
+                    parts.append(f"Source [{page_id}]: {result.url} (see above)\n")
+                    continue
+                if not result.error and not excerpts[page_id]:
+                    continue
+                quoted.add(page_id)
+                parts.append(f"Source [{page_id}]: {result.url}\n")
+                if result.error:
+                    parts.append(f"Error: {result.error}\n")
+                else:
+                    parts.append(f"Content Excerpts:\n- {excerpts[page_id]}\n")
+            parts.append("\n")
+        return "".join(parts)
+
+    def _markdown_to_html(self, markdown_text):
+        return markdown.markdown(markdown_text, extensions=['extra', ReportStructureExtension()])
 
     def _create_html_template(self, title, content):
+        return f"{self._html_document_start(title)}{content}{self._html_document_end()}"
+
+    def _html_document_start(self, title):
         return f"""
         <!DOCTYPE html>
         <html lang="en">
@@ -310,7 +557,10 @@ class ReportGenerator:
                 <p class="timestamp">Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
             </header>
             <main>
-                {content}
+                """
+
+    def _html_document_end(self):
+        return f"""
             </main>
             <footer>
                 <p>&copy; {datetime.now().year} Research Report</p>
@@ -321,18 +571,19 @@ class ReportGenerator:
 
 if __name__ == "__main__":
     # For testing purposes
+    from src.records import PageResult
+
     logging.basicConfig(level=CONFIG["LOG_LEVEL"], format=CONFIG["LOG_FORMAT"])
     ai_model = AIModelInterface()
     report_generator = ReportGenerator(ai_model)
     
     test_topic = "Artificial Intelligence in Healthcare"
     test_research_data = [
-        {
-            "url": "https://example.com/ai-healthcare",
-            "title": "AI in Healthcare: Revolutionizing Patient Care",
-            "content": "AI is transforming healthcare in numerous ways, from improving diagnosis accuracy to personalizing treatment plans...",
-            "error": None
-        }
+        PageResult(
+            "https://example.com/ai-healthcare",
+            "AI in Healthcare: Revolutionizing Patient Care",
+            "AI is transforming healthcare in numerous ways, from improving diagnosis accuracy to personalizing treatment plans...",
+        )
     ]
     
     initial_report = report_generator.generate_initial_report(test_topic, test_research_data)
@@ -1,56 +1,240 @@
+import asyncio
 import logging
-import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from config import CONFIG
-from src.scraper import Scraper
-from src.report_generator import ReportGenerator, AIModelInterface
+from src.scraper import Scraper, collect_research, split_questions
+from src.report_generator import ReportGenerator, AIModelInterface, IncrementalHTMLWriter, LLMError
+from src.async_researcher import AsyncResearcher
+from src.checkpoint import CheckpointStore, new_run_id
+from src.dedup import PageDeduplicator, canonicalize_url
+from src.records import ResearchData
+from src.instrumentation import Tracer, export_trace, propagate, use_tracer
+from src.pipeline import StagePipeline
+from src.run_output import RunOutput, use_run
 
 logger = logging.getLogger(__name__)
 
 class Researcher:
-    def __init__(self, num_results=3):
-        self.scraper = Scraper(num_results)
-        self.ai_model = AIModelInterface()
+    def __init__(self, num_results=3, use_cache=None, use_llm_cache=None, ai_client=None, use_corpus=None):
+        self.scraper = Scraper(num_results, use_cache=use_cache, use_corpus=use_corpus)
+        self.ai_model = AIModelInterface(client=ai_client, use_cache=use_llm_cache)
         self.report_generator = ReportGenerator(self.ai_model)
+        self._async_options = {"num_results": num_results, "use_cache": use_cache, "use_llm_cache": use_llm_cache,
+                               "use_corpus": use_corpus}
 
-    def research_followup_questions(self, questions):
+    def research_followup_questions(self, questions, dedup=None):
         """Perform additional research based on follow-up questions."""
         logger.info("Researching follow-up questions")
-        additional_data = []
-        for question in questions.split('\n'):
-            if question.strip():  # Ensure the question is not empty
-                logger.info(f"Researching question: {question}")
-                question_data = self.scraper.search_and_scrape(question)
-                additional_data.append({"question": question, "data": question_data})
-        return additional_data
-
-    def general_purpose_research(self, topic):
+        questions = split_questions(questions)
+        if not questions:
+            return ResearchData()
+
+        for question in questions:
+            logger.info(f"Researching question: {question}")
+
+        # Search for every question at once
+        dedup = dedup or PageDeduplicator()
+        max_workers = min(CONFIG.get("FOLLOWUP_CONCURRENCY", 3), len(questions))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            question_sources = list(executor.map(
+                propagate(lambda question: self.scraper.search_sources(question, dedup)), questions))
+
+        # Fetch the union of result URLs once, in one shared stage
+        self.scraper.scrape_into([url for urls, _ in question_sources for url in urls], dedup)
+        return collect_research(questions, question_sources, dedup)
+
+    def general_purpose_research(self, topic, tracer=None, run_id=None):
+        tracer = tracer or Tracer(run=topic)
+        output = RunOutput(run_id or new_run_id(topic))
+        with use_tracer(tracer), use_run(output):
+            try:
+                with tracer.span("research", topic=topic, run_id=output.run_id):
+                    report_filename = self._research(topic, output)
+                trace_path = export_trace(tracer, "research", output.directory)
+            finally:
+                output.close()
+        if trace_path:
+            logger.info(f"Run trace saved as {trace_path}")
+        return report_filename
+
+    def resume_research(self, run_id, tracer=None):
+        """Continue an interrupted run from the stages it checkpointed."""
+        checkpoints = self._checkpoints(run_id)
+        if not checkpoints or not checkpoints.exists():
+            raise ValueError(f"No checkpointed run with ID '{run_id}'")
+        topic = checkpoints.load_meta()["topic"]
+        logger.info(f"Resuming run {run_id} on topic: {topic}")
+        return self.general_purpose_research(topic, tracer=tracer, run_id=run_id)
+
+    def stream_followup_research(self, initial_report, dedup=None):
+        """Generate follow-up questions and research each one as soon as its line is streamed.
+
+        Searches start while the questions are still being generated; pages are
+        fetched on a shared pool so a page returned for several questions (or
+        already fetched earlier in the run) is only scraped once. Returns
+        (questions, additional_research_data).
+        """
+        dedup = dedup or PageDeduplicator()
+        url_futures = {}
+        url_lock = threading.Lock()
+        question_futures = []
+        parts = []
+
+        with ThreadPoolExecutor(max_workers=CONFIG.get("FOLLOWUP_CONCURRENCY", 3)) as question_pool, \
+                ThreadPoolExecutor(max_workers=self.scraper.max_workers) as page_pool:
+
+            def scrape(url):
+                dedup.add(self.scraper.scrape_website(url))
+
+            def research_question(question):
+                urls, local_pages = self.scraper.search_sources(question, dedup)
+                if local_pages:
+                    return question, dedup.adopt(local_pages)
+                if not urls:
+                    logger.warning(f"No search results found for question: {question}")
+                with url_lock:
+                    for url in dedup.claim(urls):
+                        url_futures[canonicalize_url(url)] = page_pool.submit(propagate(scrape), url)
+                    futures = [url_futures[key] for key in map(canonicalize_url, urls) if key in url_futures]
+                for future in futures:
+                    future.result()
+                return question, dedup.results(urls)
+
+            def start(question):
+                if question.strip():
+                    logger.info(f"Researching question: {question}")
+                    question_futures.append(question_pool.submit(propagate(research_question), question))
+
+            pending = ""
+            for chunk in self.report_generator.stream_followup_questions(initial_report):
+                parts.append(chunk)
+                pending += chunk
+                *lines, pending = pending.split('\n')
+                for line in lines:
+                    start(line)
+            start(pending)
+
+            additional_research_data = ResearchData()
+            for future in question_futures:
+                additional_research_data.add_question(*future.result())
+
+        return "".join(parts), additional_research_data
+
+    def _stream_report(self, topic, output, initial_report, followup_questions, additional_research_data):
+        report_filename = output.report_path
+        # Render and flush each section of the report while the enhancement is still generating
+        with IncrementalHTMLWriter(report_filename, f"{topic} Research Report", self.report_generator) as writer:
+            for chunk in self.report_generator.stream_enhanced_report(initial_report, followup_questions, additional_research_data):
+                writer.feed(chunk)
+        logger.info(f"HTML report saved as {report_filename}")
+        return report_filename
+
+    def _save_report(self, topic, output, enhanced_report):
+        html_report = self.report_generator.generate_html_report(enhanced_report, f"{topic} Research Report")
+        report_filename = output.write("report.html", html_report)
+        logger.info(f"HTML report saved as {report_filename}")
+        return report_filename
+
+    def _checkpoints(self, run_id):
+        if not CONFIG.get("CHECKPOINT_ENABLED", True):
+            return None
+        return CheckpointStore(CONFIG.get("STATE_DIR", "state"), run_id)
+
+    def _stage(self, name, fn):
+        """Wrap fn so a failed LLM call names the stage it failed, which is the one --resume will rerun."""
+        def run_stage(**kwargs):
+            try:
+                return fn(**kwargs)
+            except LLMError as e:
+                raise RuntimeError(f"Stage '{name}' failed: {e}") from e
+        return run_stage
+
+    def _build_pipeline(self, topic, dedup, output, checkpoints=None):
+        """Stages of a research run, in order.
+
+        Stages are as fine-grained as the configured overlap allows, so a
+        resumed run repeats as little work as possible: with PIPELINE_OVERLAP
+        the questions and their research form one stage, and with STREAM_REPORT
+        the enhancement and the HTML report do.
+        """
+        pipeline = StagePipeline(checkpoints=checkpoints)
+
+        def add(name, fn, deps=()):
+            pipeline.add(name, self._stage(name, fn), deps)
+
+        add("initial_research_data", lambda: self.scraper.search_and_scrape(topic, dedup))
+        add("initial_report",
+            lambda initial_research_data: self.report_generator.generate_initial_report(topic, initial_research_data),
+            deps=["initial_research_data"])
+
+        def run_pages(initial_research_data):
+            # A resumed run restores its initial pages from a checkpoint, so dedup has to learn them again
+            # before follow-up research, or it would fetch them anew and accept them as corpus answers
+            dedup.adopt(initial_research_data)
+            return dedup
+
+        if CONFIG.get("PIPELINE_OVERLAP", True):
+            add("followup",
+                lambda initial_research_data, initial_report: self.stream_followup_research(
+                    initial_report, run_pages(initial_research_data)),
+                deps=["initial_research_data", "initial_report"])
+        else:
+            add("followup_questions", self.report_generator.generate_followup_questions, deps=["initial_report"])
+            add("followup",
+                lambda initial_research_data, followup_questions: (
+                    followup_questions,
+                    self.research_followup_questions(followup_questions, run_pages(initial_research_data))),
+                deps=["initial_research_data", "followup_questions"])
+
+        if CONFIG.get("STREAM_REPORT", True):
+            add("report_filename",
+                lambda initial_report, followup: self._stream_report(topic, output, initial_report, *followup),
+                deps=["initial_report", "followup"])
+        else:
+            add("enhanced_report",
+                lambda initial_report, followup: self.report_generator.enhance_report(initial_report, *followup),
+                deps=["initial_report", "followup"])
+            add("report_filename", lambda enhanced_report: self._save_report(topic, output, enhanced_report),
+                deps=["enhanced_report"])
+        return pipeline
+
+    def _research(self, topic, output):
         logger.info(f"Starting research on topic: {topic}")
         
-        with open('debug/results.txt', "w") as f:
-            f.write("")
-        
-        initial_research_data = self.scraper.search_and_scrape(topic)
-        
-        initial_report = self.report_generator.generate_initial_report(topic, initial_research_data)
-        
-        followup_questions = self.report_generator.generate_followup_questions(initial_report)
-        
-        additional_research_data = self.research_followup_questions(followup_questions)
-        
-        enhanced_report = self.report_generator.enhance_report(initial_report, followup_questions, additional_research_data)
-        
-        html_report = self.report_generator.generate_html_report(enhanced_report, f"{topic} Research Report")
+        checkpoints = self._checkpoints(output.run_id)
+        if checkpoints:
+            if not checkpoints.exists():
+                checkpoints.save_meta(topic=topic, created_at=time.time())
+            logger.info(f"Run ID: {output.run_id} (if it fails, continue it with --resume {output.run_id})")
+
+        # Pages seen anywhere in this run, so mirrors and repeats are fetched and sent once
+        dedup = PageDeduplicator(CONFIG.get("CONTENT_DEDUP_DISTANCE", 3))
+        results = self._build_pipeline(topic, dedup, output, checkpoints).run()
+        report_filename = results["report_filename"]
+        if checkpoints and not CONFIG.get("CHECKPOINT_KEEP_COMPLETED", False):
+            checkpoints.clear()
         
-        # Save to report dir, create dir if not exists
-        os.makedirs(CONFIG["REPORTS_DIR"], exist_ok=True)
-        report_filename = os.path.join(CONFIG["REPORTS_DIR"], f"{topic.replace(' ', '_')}_report.html")
-        with open(report_filename, 'w') as f:
-            f.write(html_report)
-        logger.info(f"HTML report saved as {report_filename}")
+        logger.info(f"Deduplication stats: {dedup.stats()}")
+        if self.scraper.cache:
+            logger.info(f"HTTP cache stats: {self.scraper.cache.stats()}")
+        if self.scraper.corpus:
+            logger.info(f"Corpus stats: {self.scraper.corpus.stats()}")
+        if self.ai_model.cache:
+            logger.info(f"LLM cache stats: {self.ai_model.cache.stats()}")
         
         logger.info(f"Research on '{topic}' completed. HTML report and conversation saved.")
         return report_filename
 
+    def research_many(self, topics, ai_client=None):
+        """Research several topics concurrently in this process via AsyncResearcher."""
+        async def run():
+            async with AsyncResearcher(ai_client=ai_client, **self._async_options) as researcher:
+                return await researcher.research_many(topics)
+
+        return asyncio.run(run())
+
 if __name__ == "__main__":
     logging.basicConfig(level=CONFIG["LOG_LEVEL"], format=CONFIG["LOG_FORMAT"])
     researcher = Researcher()
@@ -0,0 +1,82 @@
+import contextvars
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from config import CONFIG
+from src.fileutil import atomic_write
+from src.conversation_logger import ConversationLogger
+
+_current_run = contextvars.ContextVar("run_output", default=None)
+
+
+class RunOutput:
+    """Files written by one research run, all under <RUNS_DIR>/<run id>/.
+
+    The report, trace and conversation log of a run never share a path with
+    another run's, so runs on parallel threads or processes cannot clobber
+    each other. Debug dumps (scraped pages, follow-up questions) are only kept
+    when debug is on; they are buffered in memory and written atomically to
+    debug/ when the run is closed.
+    """
+
+    def __init__(self, run_id, runs_dir=None, debug=None):
+        self.run_id = run_id
+        self.directory = os.path.join(runs_dir or CONFIG.get("RUNS_DIR", "runs"), run_id)
+        self.debug_enabled = CONFIG.get("DEBUG_OUTPUT", False) if debug is None else debug
+        log_name = os.path.basename(CONFIG.get("CONVERSATION_LOG_PATH", "conversation_log.jsonl"))
+        self.conversation_logger = ConversationLogger(
+            self.path(log_name),
+            flush_every=CONFIG.get("CONVERSATION_LOG_FLUSH_EVERY", 20),
+            flush_interval=CONFIG.get("CONVERSATION_LOG_FLUSH_INTERVAL", 5.0),
+        )
+        self._debug = defaultdict(list)
+        self._lock = threading.Lock()
+
+    @property
+    def report_path(self):
+        return self.path("report.html")
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def write(self, name, data):
+        """Atomically write data to file name of this run and return its path."""
+        path = self.path(name)
+        atomic_write(path, data)
+        return path
+
+    def debug(self, name, text):
+        if not self.debug_enabled:
+            return
+        with self._lock:
+            self._debug[name].append(text)
+
+    def close(self):
+        self.conversation_logger.close()
+        with self._lock:
+            debug, self._debug = self._debug, defaultdict(list)
+        for name, parts in debug.items():
+            self.write(os.path.join("debug", name), "".join(parts))
+
+
+def current_run():
+    return _current_run.get()
+
+
+@contextmanager
+def use_run(run):
+    """Make run the one that debug() and the conversation log write to within this context."""
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+
+
+def debug(name, text):
+    """Buffer text for debug file name of the current run; a no-op outside a run or with debug off."""
+    run = _current_run.get()
+    if run is not None:
+        run.debug(name, text)
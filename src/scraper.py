@@ -1,80 +1,269 @@
+import codecs
 import logging
-import requests
+import threading
+import time
 from bs4 import BeautifulSoup
-from urllib.parse import quote_plus
-import re
+from collections import defaultdict
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote_plus, urlsplit
 import os
+from config import CONFIG
+from src.cache import DiskCache, normalize_url, revalidation_headers, response_meta
+from src.corpus import Corpus
+from src.dedup import PageDeduplicator
+from src.extractor import BS4_PARSER, StreamingExtractor
+from src.http_session import HTTPSession
+from src.records import PageResult, ResearchData
+from src import instrumentation, run_output
 
 logger = logging.getLogger(__name__)
 
-class Scraper:
-    def __init__(self, num_results=3):
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+SEARCH_URL = "https://www.google.com/search?q={query}"
+
+def append_debug_result(url, title, text_content):
+    run_output.debug("results.txt", f"URL: {url}\nTitle: {title}\nContent: {text_content[:500]}...\n---\n\n")
+
+def parse_search_results(html, num_results):
+    """Extract result URLs from a Google results page."""
+    soup = BeautifulSoup(html, BS4_PARSER)
+    search_results = soup.find_all('div', class_='yuRUbf')
+    return [result.find('a')['href'] for result in search_results[:num_results]]
+
+def split_questions(questions):
+    """The non-empty lines of a follow-up questions response."""
+    return [question for question in questions.split('\n') if question.strip()]
+
+def collect_research(questions, question_sources, dedup):
+    """ResearchData for questions from their (urls, local pages) sources, with fetched pages taken from dedup."""
+    research_data = ResearchData()
+    for question, (urls, local_pages) in zip(questions, question_sources):
+        if not urls and not local_pages:
+            logger.warning(f"No search results found for question: {question}")
+        research_data.add_question(question, dedup.adopt(local_pages) if local_pages else dedup.results(urls))
+    return research_data
+
+class ScraperBase:
+    """Settings, caches, corpus and result handling shared by Scraper and AsyncScraper.
+
+    Subclasses only differ in how they perform I/O: they implement fetching
+    and searching, and build their results with the helpers here.
+    """
+
+    def __init__(self, num_results=3, per_host_limit=None, use_cache=None, use_corpus=None):
         self.num_results = num_results
+        self.per_host_limit = per_host_limit or CONFIG.get("SCRAPER_PER_HOST_LIMIT", 2)
+        self.max_page_bytes = CONFIG.get("MAX_PAGE_BYTES", 2 * 1024 * 1024)
+        self.max_content_chars = CONFIG.get("MAX_CONTENT_CHARS", 5000)
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            "User-Agent": USER_AGENT
         }
 
+        if use_cache is None:
+            use_cache = CONFIG.get("HTTP_CACHE_ENABLED", True)
+        self.cache = DiskCache(
+            os.path.join(CONFIG.get("CACHE_DIR", "cache"), "http.sqlite3"),
+            ttl=CONFIG.get("HTTP_CACHE_TTL", 86400),
+            max_bytes=CONFIG.get("HTTP_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+            name="http",
+        ) if use_cache else None
+
+        if use_corpus is None:
+            use_corpus = CONFIG.get("CORPUS_ENABLED", True)
+        self.corpus = Corpus(
+            os.path.join(CONFIG.get("CACHE_DIR", "cache"), "corpus.sqlite3"),
+            max_age=CONFIG.get("CORPUS_MAX_AGE", 7 * 86400),
+            min_coverage=CONFIG.get("CORPUS_MIN_COVERAGE", 0.6),
+        ) if use_corpus else None
+
+    def _search_url(self, query):
+        return CONFIG.get("SEARCH_URL", SEARCH_URL).format(query=quote_plus(query))
+
+    def _store(self, key, body, headers):
+        if self.cache and body:
+            self.cache.set(key, "".join(body), response_meta(headers))
+
+    def _page(self, url, title, text_content):
+        """PageResult for an extracted page, which is also kept in the corpus."""
+        append_debug_result(url, title, text_content)
+
+        page = PageResult(url, title, text_content)  # content already limited to max_content_chars
+        if self.corpus:
+            self.corpus.add(page)
+        return page
+
+    def _lookup_corpus(self, query, dedup=None):
+        """(local pages, sufficient) for query, leaving out pages dedup already holds; see Corpus.lookup."""
+        if not self.corpus:
+            return [], False
+        return self.corpus.lookup(query, self.num_results, dedup.keys() if dedup else ())
+
+    def _choose_sources(self, query, urls, local_pages):
+        if not urls and local_pages:
+            logger.info(f"Using {len(local_pages)} local corpus pages for '{query}'")
+        return (urls, []) if urls else ([], local_pages)
+
+    def _scraped(self, urls, dedup):
+        results = dedup.results(urls)
+        for result in results:
+            logger.info(f"Scraped data from {result.url}")
+        return results
+
+
+class Scraper(ScraperBase):
+    def __init__(self, num_results=3, max_workers=None, per_host_limit=None, use_cache=None, use_corpus=None):
+        super().__init__(num_results, per_host_limit, use_cache, use_corpus)
+        self.max_workers = max_workers or CONFIG.get("SCRAPER_MAX_WORKERS", 8)
+        self.timeout = (CONFIG.get("CONNECT_TIMEOUT", 5), CONFIG.get("READ_TIMEOUT", 15))
+        self.session = HTTPSession(pool_size=max(self.max_workers, CONFIG.get("HTTP_POOL_SIZE", 32)))
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host_limit))
+        self._host_slots_lock = threading.Lock()
+
+    def _host_slot(self, url):
+        """Return the semaphore capping concurrent requests to the host of url."""
+        with self._host_slots_lock:
+            return self._host_slots[urlsplit(url).netloc.lower()]
+
+    def _stream(self, url, stats=None):
+        """Yield the body of url as decoded text chunks, capped at max_page_bytes.
+
+        Fresh cache entries are served without touching the network; stale ones
+        are revalidated with If-None-Match/If-Modified-Since. The body is written
+        back to the cache only when it was read to the end or the cap (or the
+        server had sent all of it when the consumer stopped): a body cut short
+        by the consumer or a failed download would be served, and revalidated,
+        as if it were the whole page.
+        Cache status and bytes received are recorded in stats if given.
+        """
+        stats = {} if stats is None else stats
+        key = normalize_url(url)
+        entry = self.cache.get(key) if self.cache else None
+        if entry and entry.fresh:
+            stats["cache"] = "hit"
+            yield entry.value
+            return
+        stats["cache"] = "revalidate" if entry else ("miss" if self.cache else "off")
+
+        headers = {**self.headers, **revalidation_headers(entry)}
+
+        with self._host_slot(url):
+            response = self.session.get(url, headers=headers, timeout=self.timeout, stream=True)
+            try:
+                if entry and response.status_code == 304:
+                    stats["cache"] = "revalidated"
+                    self.cache.refresh(key)
+                    yield entry.value
+                    return
+
+                response.raise_for_status()
+                decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+                body = []
+                received = 0
+                try:
+                    for chunk in response.iter_content(chunk_size=16384):
+                        received += len(chunk)
+                        stats["bytes"] = received
+                        instrumentation.count("bytes_fetched", len(chunk))
+                        text = decoder.decode(chunk)
+                        body.append(text)
+                        yield text
+                        if received >= self.max_page_bytes:
+                            logger.info(f"Stopped reading {url} at {received} bytes")
+                            break
+                except GeneratorExit:
+                    # The consumer stopped early; the body is only whole if nothing was left to read
+                    if getattr(response.raw, "length_remaining", None) == 0:
+                        self._store(key, body, response.headers)
+                    raise
+                self._store(key, body, response.headers)
+            finally:
+                response.close()
+
+    def _fetch(self, url, stats=None):
+        """GET url and return its (capped) text."""
+        return "".join(self._stream(url, stats))
+
     def get_search_results(self, query):
-        search_url = f"https://www.google.com/search?q={quote_plus(query)}"
+        search_url = self._search_url(query)
         try:
-            response = requests.get(search_url, headers=self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            search_results = soup.find_all('div', class_='yuRUbf')
-            urls = [result.find('a')['href'] for result in search_results[:self.num_results]]
-            return urls
+            with instrumentation.span("search", query=query) as attrs:
+                html = self._fetch(search_url, attrs)
+            with instrumentation.span("parse_search"):
+                return parse_search_results(html, self.num_results)
         except Exception as e:
             logger.error(f"Error getting search results for query '{query}': {str(e)}")
             return []
 
     def scrape_website(self, url):
         try:
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            main_content = soup.find('main') or soup.find('article') or soup.find('body')
-            
-            text_content = main_content.get_text(separator='\n', strip=True) if main_content else ""
-            
-            text_content = re.sub(r'\s+', ' ', text_content)
-            text_content = re.sub(r'\n+', '\n', text_content) 
-            
-            title = soup.title.string if soup.title else ""
-            
-            with open('debug/results.txt', "a") as f:
-                f.write(f"URL: {url}\n")
-                f.write(f"Title: {title}\n")
-                f.write(f"Content: {text_content[:500]}...\n")
-                f.write("---\n\n")
-            
-            return {
-                "url": url,
-                "title": title,
-                "content": text_content[:5000],  # Limit content to first 5000 characters
-                "error": None
-            }
+            extractor = StreamingExtractor(self.max_content_chars)
+            parse_seconds = 0.0
+            with instrumentation.span("fetch", url=url) as attrs, closing(self._stream(url, attrs)) as chunks:
+                for chunk in chunks:
+                    start = time.perf_counter()
+                    done = extractor.feed(chunk)
+                    parse_seconds += time.perf_counter() - start
+                    if done:
+                        break
+                start = time.perf_counter()
+                title, text_content = extractor.result()
+                parse_seconds += time.perf_counter() - start
+                attrs["parse_seconds"] = round(parse_seconds, 6)
+            instrumentation.record("parse", parse_seconds, url=url)
+            return self._page(url, title, text_content)
         except Exception as e:
             logger.error(f"Error scraping website {url}: {str(e)}")
-            return {"url": url, "title": "", "content": "", "error": str(e)}
+            return PageResult.failed(url, e)
 
-    def search_and_scrape(self, topic):
+    def search_sources(self, query, dedup=None):
+        """Return (urls to scrape, pages already in the local corpus) for query.
+
+        The web is searched only when the corpus cannot answer query with
+        enough fresh pages; if the search then comes back empty (e.g. when
+        offline), whatever the corpus matched is used instead. Pages the run's
+        dedup already holds don't count, so follow-up questions are not
+        answered with the pages the run started from.
+        """
+        local_pages, sufficient = self._lookup_corpus(query, dedup)
+        if sufficient:
+            return [], local_pages
+        return self._choose_sources(query, self.get_search_results(query), local_pages)
+
+    def search_and_scrape(self, topic, dedup=None):
         logger.info(f"Starting search and scrape for topic: {topic}")
         
-        urls = self.get_search_results(topic)
+        dedup = dedup or PageDeduplicator()
+        urls, local_pages = self.search_sources(topic, dedup)
+        if local_pages:
+            return dedup.adopt(local_pages)
         
         if not urls:
             logger.warning(f"No search results found for topic: {topic}")
             return []
 
-        results = []
-        
-        for url in urls:
-            data = self.scrape_website(url)
-            results.append(data)
-            logger.info(f"Scraped data from {url}")
-        
-        return results
+        return self.scrape_many(urls, dedup)
+
+    def scrape_many(self, urls, dedup=None):
+        """Scrape urls concurrently, returning one result per distinct page in the order of urls.
+
+        URLs that canonicalize to a page already claimed in dedup (a per-run
+        PageDeduplicator) are not fetched again, and pages whose content
+        near-duplicates an earlier one are merged into it.
+        """
+        dedup = dedup or PageDeduplicator()
+        self.scrape_into(urls, dedup)
+        return self._scraped(urls, dedup)
+
+    def scrape_into(self, urls, dedup):
+        """Concurrently scrape the urls whose pages dedup has not seen yet, adding the results to it."""
+        new_urls = dedup.claim(urls)
+        if len(new_urls) == 1:
+            dedup.add(self.scrape_website(new_urls[0]))
+        elif new_urls:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(new_urls))) as executor:
+                for result in executor.map(instrumentation.propagate(self.scrape_website), new_urls):
+                    dedup.add(result)
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -83,7 +272,7 @@ if __name__ == "__main__":
     results = scraper.search_and_scrape(test_topic)
     print(f"Found {len(results)} results for topic: {test_topic}")
     for result in results:
-        print(f"URL: {result['url']}")
-        print(f"Title: {result['title']}")
-        print(f"Content snippet: {result['content'][:200]}...")  # First 200 characters
+        print(f"URL: {result.url}")
+        print(f"Title: {result.title}")
+        print(f"Content snippet: {result.content[:200]}...")  # First 200 characters
         print("---")
\ No newline at end of file
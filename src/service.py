@@ -0,0 +1,391 @@
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from config import CONFIG
+from src.checkpoint import new_run_id
+
+logger = logging.getLogger(__name__)
+
+# State of each worker process, set up once by _init_worker
+_researcher = None
+_events = None
+_job_id = None
+
+
+class _ProgressHandler(logging.Handler):
+    """Forwards the pipeline's log records to the service as progress events of the running job."""
+
+    def emit(self, record):
+        if _job_id is None or not record.name.startswith("src."):
+            return
+        try:
+            _events.put((_job_id, {"event": "log", "level": record.levelname, "message": record.getMessage()}))
+        except Exception:
+            self.handleError(record)
+
+
+def default_researcher(**options):
+    from src.researcher import Researcher
+    return Researcher(num_results=CONFIG["NUM_SEARCH_RESULTS"], **options)
+
+
+def _init_worker(events, researcher_factory, options, config):
+    global _researcher, _events
+    CONFIG.update(config)
+    logging.basicConfig(level=CONFIG["LOG_LEVEL"], format=CONFIG["LOG_FORMAT"])
+    root = logging.getLogger()
+    for handler in root.handlers:
+        handler.setLevel(root.level)
+    # Progress events are INFO records, whatever the console shows
+    root.setLevel(min(root.level, logging.INFO))
+    root.addHandler(_ProgressHandler(logging.INFO))
+    _events = events
+    # Built once per process, so the Anthropic client, HTTP pools and caches stay warm across jobs
+    _researcher = researcher_factory(**options)
+
+
+def _run_job(job_id, topic, run_id):
+    global _job_id
+    _job_id = job_id
+    _events.put((job_id, {"event": "started", "pid": os.getpid()}))
+    try:
+        report = _researcher.general_purpose_research(topic, run_id=run_id)
+        _events.put((job_id, {"event": "finished", "status": "ok", "report": report}))
+    except Exception as e:
+        _events.put((job_id, {"event": "finished", "status": "error", "error": str(e)}))
+    finally:
+        _job_id = None
+
+
+class QueueFull(Exception):
+    pass
+
+
+class _Job:
+    __slots__ = ("job_id", "topic", "run_id", "status", "report", "error", "events", "created_at", "finished_at")
+
+    def __init__(self, job_id, topic, run_id):
+        self.job_id = job_id
+        self.topic = topic
+        self.run_id = run_id
+        self.status = "queued"
+        self.report = None
+        self.error = None
+        self.events = []
+        self.created_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("ok", "error")
+
+    def to_dict(self):
+        return {
+            "job_id": self.job_id,
+            "topic": self.topic,
+            "run_id": self.run_id,
+            "status": self.status,
+            "report": self.report,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ResearchService:
+    """Runs research jobs on a pool of warm worker processes.
+
+    Each worker process builds one Researcher when it starts and keeps it for
+    every job it runs. At most `workers` jobs run at once and at most
+    `queue_size` more wait; submit() raises QueueFull beyond that. Workers
+    send progress events (the pipeline's log messages, then a final
+    "finished" event) back over a multiprocessing queue, and each job keeps
+    its events so clients can stream them with events(). If a worker dies,
+    the jobs it took down fail and the pool is replaced with a fresh one.
+    """
+
+    def __init__(self, workers=None, queue_size=None, researcher_factory=default_researcher, researcher_options=None,
+                 max_finished_jobs=None):
+        self.workers = workers or CONFIG.get("SERVICE_WORKERS", 2)
+        self.queue_size = CONFIG.get("SERVICE_QUEUE_SIZE", 16) if queue_size is None else queue_size
+        self.max_finished_jobs = max_finished_jobs or CONFIG.get("SERVICE_MAX_FINISHED_JOBS", 1000)
+        self.accepting = True
+        self.pool_restarts = 0
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._changed = threading.Condition()
+
+        self._context = multiprocessing.get_context()
+        self._events = self._context.Queue()
+        self._initargs = (self._events, researcher_factory, researcher_options or {}, dict(CONFIG))
+        self._executor_lock = threading.Lock()
+        self._executor = self._new_executor()
+        self._dispatcher = threading.Thread(target=self._dispatch_events, daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, topic):
+        with self._changed:
+            if not self.accepting:
+                raise RuntimeError("The service is shutting down")
+            if self._active >= self.workers + self.queue_size:
+                raise QueueFull(f"{self._active} jobs are already queued or running")
+            job = _Job(secrets.token_hex(8), topic, new_run_id(topic))
+            self._jobs[job.job_id] = job
+            self._active += 1
+            self._publish_locked(job, {"event": "queued", "run_id": job.run_id})
+
+        try:
+            self._submit(job)
+        except Exception:
+            with self._changed:
+                del self._jobs[job.job_id]
+                self._active -= 1
+                self._changed.notify_all()
+            raise
+        logger.info(f"Queued job {job.job_id} on topic: {topic}")
+        return job
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context, initializer=_init_worker,
+                                   initargs=self._initargs)
+
+    def _submit(self, job):
+        executor = self._executor
+        try:
+            future = executor.submit(_run_job, job.job_id, job.topic, job.run_id)
+        except BrokenProcessPool:
+            executor = self._replace_executor(executor)
+            try:
+                future = executor.submit(_run_job, job.job_id, job.topic, job.run_id)
+            except BrokenProcessPool as e:
+                raise RuntimeError(f"The worker pool is unavailable: {e}") from e
+        future.add_done_callback(lambda future: self._job_done(job, future, executor))
+
+    def _replace_executor(self, broken):
+        """Swap the broken executor for a new pool, unless another thread already has; returns the current one."""
+        with self._executor_lock:
+            if self._executor is broken and self.accepting:
+                logger.warning("A worker process died; starting a new worker pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._new_executor()
+                self.pool_restarts += 1
+            return self._executor
+
+    def get(self, job_id):
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def events(self, job, timeout=None):
+        """Yield the events of job as they arrive, ending after its "finished" event."""
+        sent = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: len(job.events) > sent or job.finished, timeout)
+                new_events = job.events[sent:]
+                done = job.finished
+            yield from new_events
+            sent += len(new_events)
+            if done and sent == len(job.events):
+                return
+
+    def stats(self):
+        with self._changed:
+            running = sum(job.status == "running" for job in self._jobs.values())
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "running": running,
+                "queued": self._active - running,
+                "accepting": self.accepting,
+                "pool_restarts": self.pool_restarts,
+            }
+
+    def close(self, wait=True):
+        with self._changed, self._executor_lock:
+            self.accepting = False
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._events.put(None)
+        self._dispatcher.join(timeout=5)
+
+    def _dispatch_events(self):
+        while True:
+            item = self._events.get()
+            if item is None:
+                return
+            job_id, event = item
+            with self._changed:
+                job = self._jobs.get(job_id)
+                if job is not None and not job.finished:
+                    self._publish_locked(job, event)
+
+    def _job_done(self, job, future, executor):
+        # Workers report their own outcome; this only catches jobs that never got to, like crashed or cancelled ones
+        error = "cancelled" if future.cancelled() else future.exception()
+        if error is None:
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._replace_executor(executor)
+        with self._changed:
+            if not job.finished:
+                self._publish_locked(job, {"event": "finished", "status": "error", "error": str(error)})
+
+    def _publish_locked(self, job, event):
+        event = {"job_id": job.job_id, "time": time.time(), **event}
+        job.events.append(event)
+        if event["event"] == "started":
+            job.status = "running"
+        elif event["event"] == "finished":
+            job.status = event["status"]
+            job.report = event.get("report")
+            job.error = event.get("error")
+            job.finished_at = event["time"]
+            self._active -= 1
+            logger.info(f"Job {job.job_id} finished with status {job.status}")
+            self._forget_old_jobs_locked()
+        self._changed.notify_all()
+
+    def _forget_old_jobs_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished_jobs, 0)]:
+            del self._jobs[job_id]
+
+
+def make_server(service, host=None, port=None):
+    """HTTP front end of service.
+
+    POST /jobs with {"topic": ...} queues a job (202, or 429 when the queue is
+    full and 503 while shutting down); add ?stream=1 to get its progress
+    events as NDJSON on the same response. GET /jobs/<id> returns its status,
+    /jobs/<id>/events streams its events and /jobs/<id>/report serves the
+    finished HTML report (410 once its file is gone). GET /health reports
+    queue and worker usage.
+    """
+    host = host or CONFIG.get("SERVICE_HOST", "127.0.0.1")
+    port = CONFIG.get("SERVICE_PORT", 8765) if port is None else port
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+        def _send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _stream_events(self, status, job):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                for event in service.events(job):
+                    self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.debug(f"Client stopped reading events of job {job.job_id}")
+
+        def _job(self, job_id):
+            job = service.get(job_id)
+            if job is None:
+                self._send_json(404, {"error": f"No job with ID '{job_id}'"})
+            return job
+
+        def do_POST(self):
+            parts = urlsplit(self.path)
+            if parts.path != "/jobs":
+                self._send_json(404, {"error": "Not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                topic = body.get("topic", "").strip()
+            except (ValueError, AttributeError):
+                topic = ""
+            if not topic:
+                self._send_json(400, {"error": "Expected a JSON body with a non-empty 'topic'"})
+                return
+
+            try:
+                job = service.submit(topic)
+            except QueueFull as e:
+                self._send_json(429, {"error": str(e)}, {"Retry-After": "30"})
+                return
+            except RuntimeError as e:
+                self._send_json(503, {"error": str(e)})
+                return
+
+            if parse_qs(parts.query).get("stream", ["0"])[0] not in ("0", "false"):
+                self._stream_events(200, job)
+            else:
+                self._send_json(202, job.to_dict(), {"Location": f"/jobs/{job.job_id}"})
+
+        def do_GET(self):
+            path = urlsplit(self.path).path.strip("/").split("/")
+            if path == ["health"]:
+                self._send_json(200, service.stats())
+            elif len(path) == 2 and path[0] == "jobs":
+                job = self._job(path[1])
+                if job:
+                    self._send_json(200, job.to_dict())
+            elif len(path) == 3 and path[0] == "jobs" and path[2] == "events":
+                job = self._job(path[1])
+                if job:
+                    self._stream_events(200, job)
+            elif len(path) == 3 and path[0] == "jobs" and path[2] == "report":
+                job = self._job(path[1])
+                if not job:
+                    return
+                if job.status != "ok":
+                    self._send_json(409, {"error": f"Job is {job.status}", "status": job.status})
+                    return
+                try:
+                    with open(job.report, "rb") as f:
+                        data = f.read()
+                except FileNotFoundError:
+                    self._send_json(410, {"error": "The report is no longer available"})
+                    return
+                except OSError as e:
+                    logger.error(f"Error reading report of job {job.job_id}: {str(e)}")
+                    self._send_json(500, {"error": "The report could not be read"})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(host=None, port=None, workers=None, researcher_options=None):
+    """Run the research service until interrupted."""
+    service = ResearchService(workers=workers, researcher_options=researcher_options)
+    server = make_server(service, host, port)
+    bound_host, bound_port = server.server_address[:2]
+    logger.info(f"Research service listening on http://{bound_host}:{bound_port} with {service.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down research service")
+    finally:
+        server.server_close()
+        service.close()
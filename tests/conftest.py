@@ -0,0 +1,47 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import config  # noqa: F401
+except ImportError:
+    # A checkout without a local config.py runs against the example settings
+    sys.modules["config"] = importlib.import_module("example_config")
+
+from config import CONFIG  # noqa: E402
+from benchmarks.fake_services import FakeWebServer  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Keep every file a test writes inside tmp_path and restore CONFIG afterwards."""
+    saved = dict(CONFIG)
+    monkeypatch.chdir(tmp_path)
+    CONFIG.update({
+        "CACHE_DIR": str(tmp_path / "cache"),
+        "RUNS_DIR": str(tmp_path / "runs"),
+        "STATE_DIR": str(tmp_path / "state"),
+        "TRACE_DIR": str(tmp_path / "debug"),
+        "CONVERSATION_LOG_PATH": str(tmp_path / "debug" / "conversation_log.jsonl"),
+    })
+    yield CONFIG
+    CONFIG.clear()
+    CONFIG.update(saved)
+
+
+@pytest.fixture
+def web():
+    """A running FakeWebServer that the scraper searches and fetches from."""
+    with FakeWebServer(page_latency=0.0, page_bytes=6000) as server:
+        CONFIG.update({
+            "SEARCH_URL": server.search_url,
+            "SCRAPER_PER_HOST_LIMIT": 64,
+            "DOMAIN_RATE": 0,
+            "ASYNC_FETCH_RATE": 0,
+            "ASYNC_LLM_RATE": 0,
+        })
+        yield server
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fake_services import fake_report_responder
+from src.async_researcher import AsyncResearcher
+from src.fake_anthropic import FakeAsyncAnthropic
+from src.http_session import TokenBucket
+
+
+def _research(topic, responder=fake_report_responder):
+    client = FakeAsyncAnthropic(responder=responder)
+
+    async def run():
+        async with AsyncResearcher(num_results=3, use_cache=False, use_llm_cache=False, use_corpus=False,
+                                   ai_client=client) as researcher:
+            return await researcher.general_purpose_research(topic, run_id="async-run")
+
+    return asyncio.run(run()), client
+
+
+def test_async_research_writes_a_report(web, isolated_config):
+    isolated_config["MERGE_GAP_ANALYSIS"] = True
+    report, client = _research("async topic")
+    assert report.endswith("async-run/report.html")
+    assert "<h2" in open(report).read()
+    # initial report, merged questions, enhancement
+    assert client.calls == 3
+
+
+def test_async_research_fails_when_an_llm_call_fails(web):
+    def responder(prompt, max_tokens):
+        if "Analyze the following report for information gaps" in prompt:
+            raise RuntimeError("overloaded")
+        return fake_report_responder(prompt, max_tokens)
+
+    with pytest.raises(RuntimeError, match="gap_analysis"):
+        _research("async topic", responder)
+
+
+def test_token_bucket_waits_on_the_event_loop():
+    bucket = TokenBucket(rate=50, burst=1)
+    waited = asyncio.run(_acquire(bucket, 3))
+    assert waited > 0
+
+
+async def _acquire(bucket, times):
+    return sum([await bucket.acquire_async() for _ in range(times)])
@@ -0,0 +1,23 @@
+import io
+
+from src.batch import read_topics
+
+
+def test_read_topics_accepts_text_and_jsonl():
+    lines = [
+        "# comment",
+        "",
+        "plain topic",
+        '{"topic": "json topic", "priority": 1}',
+        '"Quantum" computing advances',
+        "{braces} in a plain topic",
+        '{"no_topic": true}',
+        '  padded topic  ',
+    ]
+    assert list(read_topics(io.StringIO("\n".join(lines)))) == [
+        "plain topic",
+        "json topic",
+        '"Quantum" computing advances',
+        "{braces} in a plain topic",
+        "padded topic",
+    ]
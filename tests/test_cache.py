@@ -0,0 +1,29 @@
+from src.cache import DiskCache
+
+
+def test_running_total_tracks_replacements_and_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=3000, touch_batch=1)
+    for key in "abc":
+        cache.set(key, "x" * 800 + key)
+    cache.set("a", "y" * 900 + "a")
+    assert cache._total == cache._stored_bytes()
+
+    cache.get("a")  # "b" is now the least recently used
+    for key in "defghij":
+        cache.set(key, f"{key} " + " ".join(str(i * 7919 % 10007) for i in range(400)))
+    assert cache.get("b") is None
+    assert cache._total == cache._stored_bytes() <= 3000
+
+
+def test_access_times_are_written_in_batches(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache.sqlite3"), touch_batch=3)
+    cache.set("a", "value")
+    stored = cache._conn.execute("SELECT accessed_at FROM entries").fetchone()[0]
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    assert cache._conn.execute("SELECT accessed_at FROM entries").fetchone()[0] == stored
+
+    cache.get("a")
+    assert cache._touched == {}
+    assert cache._conn.execute("SELECT accessed_at FROM entries").fetchone()[0] > stored
@@ -0,0 +1,43 @@
+from src.context_packer import ContextPacker, bm25_scores, estimate_tokens, split_passages
+
+RELEVANT = "Solar panel efficiency improved to record levels this year. New perovskite cells convert more sunlight."
+OFF_TOPIC = [
+    f"Page {i} covers football results, transfer rumours and the league table after round {i} of the season."
+    for i in range(20)
+]
+
+
+def test_passages_hold_whole_sentences():
+    text = " ".join(f"Sentence number {i} has some words." for i in range(30))
+    passages = split_passages(text, max_words=20)
+    assert len(passages) > 1
+    assert all(passage.endswith(".") and len(passage.split()) <= 20 for passage in passages)
+    assert " ".join(passages) == text
+
+
+def test_bm25_ranks_matching_passages_first():
+    scores = bm25_scores("solar panel efficiency", [OFF_TOPIC[0], RELEVANT, "Solar power is popular."])
+    assert scores[1] > scores[2] > scores[0] == 0
+
+
+def test_pack_respects_the_token_budget_and_prefers_relevant_passages():
+    documents = OFF_TOPIC + [RELEVANT]
+    budget = estimate_tokens(RELEVANT) + estimate_tokens(OFF_TOPIC[0])
+    excerpts = ContextPacker(passage_words=20).pack("solar panel efficiency", documents, budget)
+    assert sum(estimate_tokens(excerpt) for excerpt in excerpts if excerpt) <= budget
+    assert excerpts[-1] == RELEVANT
+    assert sum(bool(excerpt) for excerpt in excerpts[:-1]) <= 1
+
+
+def test_pack_drops_near_duplicate_passages_across_calls():
+    packer = ContextPacker(passage_words=40)
+    first = packer.pack("solar", [RELEVANT, RELEVANT.replace("this year", "this  year")], 1000)
+    assert first == [RELEVANT, ""]
+    # A later call (e.g. the follow-up research) doesn't quote the passage again
+    assert packer.pack("solar", [RELEVANT], 1000) == [""]
+
+
+def test_kept_passages_stay_in_page_order():
+    document = "Cats sleep a lot. " * 3 + "Solar cells convert sunlight. " + "Dogs bark loudly. " * 3
+    excerpt = ContextPacker(passage_words=4).pack("solar sunlight cats dogs", [document], 1000)[0]
+    assert excerpt.index("Cats") < excerpt.index("Solar") < excerpt.index("Dogs")
@@ -0,0 +1,53 @@
+import multiprocessing
+
+import pytest
+
+from src.conversation_logger import ConversationLogger, read_conversation
+
+
+def _write(path, worker, count):
+    logger = ConversationLogger(path, flush_every=3)
+    for i in range(count):
+        logger.log_interaction("user", f"worker {worker} message {i}")
+    logger.close()
+
+
+@pytest.mark.parametrize("name", ["log.jsonl", "log.jsonl.gz"])
+def test_records_read_back_across_flushes(tmp_path, name):
+    path = str(tmp_path / name)
+    logger = ConversationLogger(path, flush_every=2, flush_interval=3600)
+    for i in range(5):
+        logger.log_interaction("user", f"message {i}")
+    # Two batches are on disk; the fifth record is still buffered
+    assert len(list(read_conversation(path))) == 4
+    logger.log_interaction("system", "error")  # flushed at once
+    assert [record["content"] for record in read_conversation(path)] == [
+        "message 0", "message 1", "message 2", "message 3", "message 4", "error"]
+    logger.close()
+
+
+def test_get_full_conversation_is_scoped_to_its_logger(tmp_path):
+    path = str(tmp_path / "shared.jsonl")
+    first = ConversationLogger(path)
+    second = ConversationLogger(path)
+    first.log_interaction("user", "first prompt")
+    second.log_interaction("user", "second prompt")
+    first.log_interaction("assistant", "first answer")
+    assert [record["content"] for record in first.get_full_conversation()] == ["first prompt", "first answer"]
+    assert [record["content"] for record in second.get_full_conversation()] == ["second prompt"]
+    assert len(list(read_conversation(path))) == 3
+    first.close()
+    second.close()
+
+
+@pytest.mark.parametrize("name", ["log.jsonl", "log.jsonl.gz"])
+def test_concurrent_processes_append_whole_records(tmp_path, name):
+    path = str(tmp_path / name)
+    processes = [multiprocessing.Process(target=_write, args=(path, worker, 50)) for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    records = list(read_conversation(path))
+    assert len(records) == 200
+    assert len({record["session"] for record in records}) == 4
@@ -0,0 +1,55 @@
+import pytest
+
+from src.dedup import PageDeduplicator, canonicalize_url, simhash
+from src.records import PageResult
+
+ARTICLE = (
+    "The central bank raised its benchmark interest rate by half a percentage point on Wednesday, "
+    "citing persistent inflation in services and a labour market that remains tight. Officials said "
+    "further increases were likely this year, and markets now expect the rate to peak in the autumn. "
+    "Analysts noted that mortgage costs have already risen sharply and that consumer spending slowed."
+)
+
+
+@pytest.mark.parametrize("url, same_as", [
+    ("http://www.example.com/news/story/", "https://example.com/news/story"),
+    ("https://m.example.com/news/story#comments", "https://example.com/news/story"),
+    ("https://example.com/news/story?utm_source=x&gclid=1&b=2&a=1", "https://example.com/news/story?a=1&b=2"),
+    ("https://example.com/amp/news/story?amp=1", "https://example.com/news/story"),
+    ("https://example.com/news/story?outputType=amp", "https://example.com/news/story"),
+    ("https://Example.com:443/news/story", "https://example.com/news/story"),
+])
+def test_mirror_spellings_share_a_canonical_url(url, same_as):
+    assert canonicalize_url(url) == canonicalize_url(same_as)
+
+
+@pytest.mark.parametrize("url, other", [
+    ("https://example.com/search?q=amp", "https://example.com/search"),
+    ("https://m.com/page", "https://com/page"),
+    ("https://example.com/page?id=1", "https://example.com/page?id=2"),
+    ("https://example.com:8080/page", "https://example.com/page"),
+])
+def test_different_pages_keep_distinct_canonical_urls(url, other):
+    assert canonicalize_url(url) != canonicalize_url(other)
+
+
+def test_simhash_distance_tracks_similarity():
+    edited = ARTICLE.replace("Wednesday", "Thursday")
+    unrelated = "Recipes for sourdough bread need a starter, flour, water and salt, plus a long slow rise overnight."
+    assert bin(simhash(ARTICLE) ^ simhash(ARTICLE)).count("1") == 0
+    assert bin(simhash(ARTICLE) ^ simhash(edited)).count("1") <= 8
+    assert bin(simhash(ARTICLE) ^ simhash(unrelated)).count("1") > 16
+
+
+def test_deduplicator_skips_repeat_urls_and_merges_near_duplicates():
+    dedup = PageDeduplicator(max_distance=8)
+    assert dedup.claim(["https://example.com/a", "https://www.example.com/a/", "https://other.com/b"]) == [
+        "https://example.com/a", "https://other.com/b"]
+    dedup.add(PageResult("https://example.com/a", "A", ARTICLE))
+    dedup.add(PageResult("https://other.com/b", "B", ARTICLE.replace("Wednesday", "Thursday")))
+
+    pages = dedup.results(["https://example.com/a", "https://other.com/b", "http://example.com/a"])
+    assert [page.url for page in pages] == ["https://example.com/a"]
+    assert dedup.stats()["fetches_saved"] == 1
+    assert dedup.stats()["pages_merged"] == 1
+    assert "https://other.com/b" not in dedup.claim(["https://other.com/b"])
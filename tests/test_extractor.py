@@ -0,0 +1,32 @@
+from src.extractor import StreamingExtractor, extract_text
+
+NAV = "<nav>" + "".join(f"<a href='/{i}'>Navigation link number {i}</a> " for i in range(1500)) + "</nav>"
+ARTICLE = "The actual article text explains the findings in detail. " * 20
+PAGE = f"<html><head><title>Article</title></head><body>{NAV}<main><p>{ARTICLE}</p></main></body></html>"
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_main_after_long_nav_is_extracted_when_streamed():
+    title, text = extract_text(chunks(PAGE, 16384))
+    assert title == "Article"
+    assert text.startswith("The actual article text")
+
+
+def test_result_does_not_depend_on_chunking():
+    assert extract_text(chunks(PAGE, 16384)) == extract_text([PAGE]) == extract_text(chunks(PAGE, 1000))
+
+
+def test_stops_early_once_main_holds_enough_text():
+    extractor = StreamingExtractor(max_chars=200)
+    page = f"<html><body><main><p>{ARTICLE}</p>"
+    assert extractor.feed(page)
+
+
+def test_body_is_used_when_there_is_no_main():
+    extractor = StreamingExtractor(max_chars=100)
+    assert not extractor.feed(f"<html><body><p>{ARTICLE}</p>")
+    assert extractor.feed("</body></html>")
+    assert extractor.result()[1].startswith("The actual article text")
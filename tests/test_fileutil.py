@@ -0,0 +1,33 @@
+import importlib
+import os
+import stat
+from unittest import mock
+
+import src.fileutil
+from src.fileutil import atomic_write
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_atomic_write_uses_the_default_file_mode(tmp_path):
+    plain = tmp_path / "plain.txt"
+    plain.write_text("x")
+    path = str(tmp_path / "out" / "report.html")
+    atomic_write(path, "<html></html>")
+    assert open(path).read() == "<html></html>"
+    assert _mode(path) == _mode(plain)
+    assert os.listdir(tmp_path / "out") == ["report.html"]
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = str(tmp_path / "state.pickle")
+    atomic_write(path, b"old")
+    atomic_write(path, b"new")
+    assert open(path, "rb").read() == b"new"
+
+
+def test_importing_does_not_touch_the_umask():
+    with mock.patch("os.umask", side_effect=AssertionError("umask changed at import")):
+        importlib.reload(src.fileutil)
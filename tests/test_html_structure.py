@@ -0,0 +1,46 @@
+import xml.etree.ElementTree as etree
+
+import markdown
+
+from src.html_structure import ReportStructureExtension
+
+
+def _render(text):
+    html = markdown.markdown(text, extensions=["extra", ReportStructureExtension()])
+    return etree.fromstring(f"<root>{html}</root>")
+
+
+def _outline(element):
+    """Nested [heading text, child sections...] lists of the <section> tree under element."""
+    return [[section[0].text, *_outline(section)] for section in element.findall("section")]
+
+
+def test_headers_open_nested_sections():
+    root = _render("# Report\nIntro\n## Findings\nText\n### Detail\nMore\n## Conclusion\nDone\n# Appendix\n")
+    assert _outline(root) == [["Report", ["Findings", ["Detail"]], ["Conclusion"]], ["Appendix"]]
+    findings = root.find("section/section")
+    assert [child.tag for child in findings] == ["h2", "p", "section"]
+
+
+def test_nested_markdown_lists_are_kept():
+    root = _render("## Points\n\n- one\n- two\n    - nested *a*\n    - nested b\n")
+    items = root.findall("section/ul/li")
+    assert [item.text for item in items] == ["one", "two"]
+    nested = items[1].findall("ul/li")
+    assert len(nested) == 2 and nested[0].find("em").text == "a"
+
+
+def test_bullet_lines_without_a_blank_line_become_lists():
+    root = _render("## Points\nSummary:\n- **first** item\n- second\n  wrapped\n\nSteps:\n1. one\n2. two\n")
+    section = root.find("section")
+    assert [child.tag for child in section] == ["h2", "p", "ul", "p", "ol"]
+    items = section.findall("ul/li")
+    assert items[0].find("strong").text == "first"
+    assert items[1].text == "second wrapped"
+    assert [item.text for item in section.findall("ol/li")] == ["one", "two"]
+
+
+def test_document_without_headers_has_no_sections():
+    root = _render("Just a paragraph.\n\nAnother one with [a link](https://example.com).\n")
+    assert [child.tag for child in root] == ["p", "p"]
+    assert root.find("p/a").get("href") == "https://example.com"
@@ -0,0 +1,136 @@
+import asyncio
+import email.utils
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src import http_session
+from src.http_session import (AsyncHTTPSession, DomainRateLimiter, HTTPSession, TokenBucket,
+                              retry_after_seconds)
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, headers) of the server's script, then 200."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests += 1
+            status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        body = b"ok"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def scripted():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ScriptedHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.script = []
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/page"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping them."""
+    delays = []
+    monkeypatch.setattr(http_session.time, "sleep", delays.append)
+    return delays
+
+
+def _session(**kwargs):
+    return HTTPSession(retry_delay=1, rate_limiter=DomainRateLimiter(0), **kwargs)
+
+
+def test_retries_5xx_up_to_max_retries(scripted, sleeps):
+    scripted.script = [(503, {})] * 5
+    response = _session(max_retries=3).get(scripted.url)
+    assert response.status_code == 503
+    assert scripted.requests == 4
+    assert len(sleeps) == 3
+
+
+def test_recovers_after_a_retry(scripted, sleeps):
+    scripted.script = [(502, {})]
+    assert _session().get(scripted.url).status_code == 200
+    assert scripted.requests == 2
+
+
+def test_honours_retry_after(scripted, sleeps):
+    scripted.script = [(429, {"Retry-After": "7"})]
+    assert _session().get(scripted.url).status_code == 200
+    assert sleeps == [7.0]
+
+
+def test_does_not_retry_4xx(scripted, sleeps):
+    scripted.script = [(404, {})]
+    assert _session().get(scripted.url).status_code == 404
+    assert scripted.requests == 1
+    assert sleeps == []
+
+
+def test_async_session_retries(scripted, monkeypatch):
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(http_session.asyncio, "sleep", no_sleep)
+    scripted.script = [(503, {}), (503, {})]
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            response = await AsyncHTTPSession(client, retry_delay=1, rate_limiter=DomainRateLimiter(0)).get(
+                scripted.url)
+            await response.aclose()
+            return response.status_code
+
+    assert asyncio.run(run()) == 200
+    assert scripted.requests == 3
+
+
+def test_retry_after_accepts_seconds_and_dates():
+    def response(value):
+        return SimpleNamespace(headers={"Retry-After": value} if value else {})
+
+    assert retry_after_seconds(response("12")) == 12.0
+    date = email.utils.formatdate(time.time() + 60, usegmt=True)
+    assert 55 <= retry_after_seconds(response(date)) <= 60
+    assert retry_after_seconds(response("soon")) is None
+    assert retry_after_seconds(response(None)) is None
+
+
+def test_backoff_is_capped(isolated_config):
+    isolated_config["MAX_BACKOFF"] = 5
+    policy = _session()
+    assert all(0 <= policy._backoff(attempt) <= 5 for attempt in range(10))
+    assert policy._backoff(0, SimpleNamespace(headers={"Retry-After": "120"})) == 5
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=20, burst=2)
+    start = time.monotonic()
+    waited = sum(bucket.acquire() for _ in range(6))
+    assert waited > 0.1
+    assert time.monotonic() - start >= 0.15
+
+
+def test_domain_rate_limiter_applies_overrides_per_host():
+    limiter = DomainRateLimiter(5, {"slow.example": 1})
+    assert limiter._bucket("https://slow.example/a").rate == 1
+    assert limiter._bucket("https://fast.example/a").rate == 5
+    assert limiter._bucket("https://fast.example/b") is limiter._bucket("https://fast.example/c")
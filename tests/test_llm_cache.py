@@ -0,0 +1,45 @@
+import time
+
+from src import cache
+from src.fake_anthropic import FakeAnthropic
+from src.report_generator import AIModelInterface
+
+
+def _model(client, use_cache=True):
+    return AIModelInterface(client=client, use_cache=use_cache)
+
+
+def test_identical_request_is_served_from_cache():
+    client = FakeAnthropic()
+    first = _model(client).generate_response("prompt", 100)
+    # A new interface, like a later run, shares the on-disk cache
+    assert _model(client).generate_response("prompt", 100) == first
+    assert client.calls == 1
+
+
+def test_disabled_cache_always_calls():
+    client = FakeAnthropic()
+    _model(client).generate_response("prompt", 100)
+    _model(client, use_cache=False).generate_response("prompt", 100)
+    assert client.calls == 2
+
+
+def test_expired_entry_calls_again(isolated_config, monkeypatch):
+    isolated_config["LLM_CACHE_TTL"] = 60
+    client = FakeAnthropic()
+    ai_model = _model(client)
+    ai_model.generate_response("prompt", 100)
+    now = time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: now + 61)
+    ai_model.generate_response("prompt", 100)
+    assert client.calls == 2
+
+
+def test_cache_key_covers_model_and_max_tokens():
+    client = FakeAnthropic()
+    ai_model = _model(client)
+    ai_model.generate_response("prompt", 100)
+    ai_model.generate_response("prompt", 200)
+    ai_model.model = "another-model"
+    ai_model.generate_response("prompt", 100)
+    assert client.calls == 3
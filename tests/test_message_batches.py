@@ -0,0 +1,58 @@
+import io
+import json
+import os
+from types import SimpleNamespace
+
+from benchmarks.fake_services import fake_report_responder
+from src.fake_anthropic import FakeAnthropic
+from src.message_batches import MessageBatchRunner, run_message_batches
+from src.researcher import Researcher
+
+
+def _run(topics, client):
+    researcher = Researcher(num_results=3, use_cache=False, use_llm_cache=False, use_corpus=False, ai_client=client)
+    runner = MessageBatchRunner(researcher.ai_model, poll_interval=0.01, max_poll_interval=0.01)
+    out = io.StringIO()
+    failures = run_message_batches(topics, researcher, out, workers=2, runner=runner)
+    return failures, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_message_batches_write_reports(web):
+    failures, records = _run(["topic a", "topic b"], FakeAnthropic(responder=fake_report_responder))
+    assert failures == 0
+    assert [record["status"] for record in records] == ["ok", "ok"]
+    assert all(os.path.exists(record["report"]) for record in records)
+
+
+def test_failed_batch_fails_every_run(web):
+    client = FakeAnthropic(responder=fake_report_responder)
+
+    def create(requests, **kwargs):
+        raise RuntimeError("batch rejected")
+
+    client.messages.batches.create = create
+    failures, records = _run(["topic a", "topic b"], client)
+    assert failures == 2
+    assert [record["status"] for record in records] == ["error", "error"]
+    assert "initial_report" in records[0]["error"]
+    assert not any(os.path.exists(os.path.join(os.getcwd(), "runs", record["run_id"], "report.html"))
+                   for record in records)
+
+
+def test_errored_request_fails_only_its_run(web):
+    client = FakeAnthropic(responder=fake_report_responder)
+    batches = client.messages.batches
+    results = batches.results
+
+    def results_with_error(message_batch_id, **kwargs):
+        for entry in results(message_batch_id, **kwargs):
+            if entry.custom_id == "topic-1":
+                error = SimpleNamespace(type="errored", error="overloaded")
+                entry = SimpleNamespace(custom_id=entry.custom_id, result=error)
+            yield entry
+
+    batches.results = results_with_error
+    failures, records = _run(["topic a", "topic b"], client)
+    assert failures == 1
+    assert [record["status"] for record in records] == ["ok", "error"]
+    assert "overloaded" in records[1]["error"]
@@ -0,0 +1,48 @@
+import pytest
+
+from src.checkpoint import CheckpointStore
+from src.pipeline import StagePipeline
+
+
+def _pipeline(calls, checkpoints=None, fail=None):
+    def stage(name, value):
+        def run(**inputs):
+            calls.append((name, inputs))
+            if name == fail:
+                raise RuntimeError(f"{name} failed")
+            return value(**inputs)
+        return run
+
+    pipeline = StagePipeline(checkpoints)
+    pipeline.add("pages", stage("pages", lambda: ["page"]))
+    pipeline.add("report", stage("report", lambda pages: f"report of {pages}"), deps=["pages"])
+    pipeline.add("questions", stage("questions", lambda report: "questions"), deps=["report"])
+    pipeline.add("final", stage("final", lambda report, questions: f"{report} + {questions}"),
+                 deps=["report", "questions"])
+    return pipeline
+
+
+def test_stages_run_in_order_with_their_inputs():
+    calls = []
+    results = _pipeline(calls).run()
+    assert [name for name, _ in calls] == ["pages", "report", "questions", "final"]
+    assert calls[3][1] == {"report": "report of ['page']", "questions": "questions"}
+    assert results["final"] == "report of ['page'] + questions"
+
+
+def test_dependencies_must_come_first():
+    with pytest.raises(ValueError, match="later"):
+        StagePipeline().add("report", lambda later: None, deps=["later"])
+
+
+def test_resume_restores_finished_stages(tmp_path):
+    checkpoints = CheckpointStore(str(tmp_path), "run")
+    calls = []
+    with pytest.raises(RuntimeError, match="questions failed"):
+        _pipeline(calls, checkpoints, fail="questions").run()
+    assert checkpoints.has("report") and not checkpoints.has("questions")
+
+    calls = []
+    results = _pipeline(calls, checkpoints).run()
+    assert [name for name, _ in calls] == ["questions", "final"]
+    assert results["final"] == "report of ['page'] + questions"
@@ -0,0 +1,70 @@
+import os
+import re
+
+import pytest
+
+from benchmarks.fake_services import fake_report_responder
+from src.fake_anthropic import FakeAnthropic
+from src.report_generator import AIModelInterface, IncrementalHTMLWriter, LLMError, ReportGenerator
+from src.researcher import Researcher
+
+REPORT = """# Report
+
+Intro citing [the source][1].
+
+## Findings
+
+Some findings.
+
+### Detail
+
+More detail, see [the other source][2].
+
+## Conclusion
+
+Done.
+
+[1]: https://example.com/one
+[2]: https://example.com/two
+"""
+
+
+def _without_timestamp(html):
+    return re.sub(r"Generated on: [^<]*", "", html)
+
+
+def test_streamed_report_matches_the_rendered_one(tmp_path):
+    generator = ReportGenerator(AIModelInterface(client=FakeAnthropic(), use_cache=False))
+    path = str(tmp_path / "report.html")
+    with IncrementalHTMLWriter(path, "Title", generator) as writer:
+        for start in range(0, len(REPORT), 7):
+            writer.feed(REPORT[start:start + 7])
+
+    streamed = open(path).read()
+    assert '<a href="https://example.com/one">the source</a>' in streamed
+    assert _without_timestamp(streamed) == _without_timestamp(generator.generate_html_report(REPORT, "Title"))
+    assert not os.path.exists(f"{path}.part")
+
+
+def test_failed_stream_leaves_no_report(web, isolated_config):
+    isolated_config.update({"STREAM_REPORT": True, "CHECKPOINT_ENABLED": False})
+
+    def responder(prompt, max_tokens):
+        if "Please incorporate answers to these questions" in prompt:
+            raise RuntimeError("overloaded")
+        return fake_report_responder(prompt, max_tokens)
+
+    researcher = Researcher(num_results=3, use_cache=False, use_llm_cache=False, use_corpus=False,
+                            ai_client=FakeAnthropic(responder=responder))
+    with pytest.raises(RuntimeError, match="overloaded"):
+        researcher.general_purpose_research("streamed topic", run_id="stream-run")
+    assert not os.path.exists(os.path.join(isolated_config["RUNS_DIR"], "stream-run", "report.html"))
+
+
+def test_failed_request_raises_without_a_tracer():
+    def responder(prompt, max_tokens):
+        raise RuntimeError("overloaded")
+
+    generator = ReportGenerator(AIModelInterface(client=FakeAnthropic(responder=responder), use_cache=False))
+    with pytest.raises(LLMError, match="initial_report.*overloaded"):
+        generator.generate_initial_report("topic", [])
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+from benchmarks.fake_services import fake_report_responder
+from src.checkpoint import CheckpointStore
+from src.fake_anthropic import FakeAnthropic
+from src.researcher import Researcher
+
+
+class _Responder:
+    """fake_report_responder that records each prompt and can fail the gap analysis."""
+
+    def __init__(self):
+        self.fail = True
+        self.prompts = []
+
+    def __call__(self, prompt, max_tokens):
+        self.prompts.append(prompt)
+        if self.fail and "Analyze the following report for information gaps" in prompt:
+            raise RuntimeError("overloaded")
+        return fake_report_responder(prompt, max_tokens)
+
+
+def test_resume_skips_completed_stages_and_keeps_the_runs_pages(web, isolated_config):
+    isolated_config.update({"PIPELINE_OVERLAP": False, "STREAM_REPORT": False, "MERGE_GAP_ANALYSIS": False})
+    responder = _Responder()
+    researcher = Researcher(num_results=3, use_cache=False, use_llm_cache=False, use_corpus=True,
+                            ai_client=FakeAnthropic(responder=responder))
+
+    with pytest.raises(RuntimeError, match="followup_questions"):
+        researcher.general_purpose_research("fake article", run_id="resumed-run")
+    initial_urls = {page.url for page in CheckpointStore(isolated_config["STATE_DIR"], "resumed-run").load(
+        "initial_research_data")}
+    assert initial_urls
+
+    lookups = []
+    lookup = researcher.scraper.corpus.lookup
+
+    def recording_lookup(query, limit, exclude=()):
+        pages, sufficient = lookup(query, limit, exclude)
+        lookups.append((exclude, pages))
+        return pages, sufficient
+
+    researcher.scraper.corpus.lookup = recording_lookup
+    responder.fail = False
+    requests_before = web.requests
+    del responder.prompts[:]
+
+    report = researcher.resume_research("resumed-run")
+    assert os.path.exists(report)
+    # The initial report is restored, not generated again
+    assert not any(prompt.lstrip().startswith("Using the following research summary") for prompt in responder.prompts)
+    # Follow-up questions are never answered with the pages the run started from
+    assert lookups
+    assert not any(page.url in initial_urls for _, pages in lookups for page in pages)
+    # ...nor fetched again
+    assert all(len(exclude) >= len(initial_urls) for exclude, _ in lookups)
+    assert web.requests > requests_before
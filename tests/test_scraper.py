@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from benchmarks.fake_services import FakeWebServer
+from src.async_researcher import AsyncScraper
+from src.cache import normalize_url
+from src.dedup import PageDeduplicator
+from src.scraper import Scraper
+
+
+class _DroppingHandler(BaseHTTPRequestHandler):
+    """Promises 64 KB with an ETag but drops the connection after 32 KB."""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(64 * 1024))
+        self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(b"x" * 32 * 1024)
+        self.wfile.flush()
+        self.close_connection = True
+
+
+@pytest.fixture
+def dropping_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _DroppingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/page"
+    server.shutdown()
+    server.server_close()
+
+
+def test_failed_download_is_not_cached(dropping_url):
+    scraper = Scraper(use_cache=True, use_corpus=False)
+    with pytest.raises(Exception):
+        scraper._fetch(dropping_url)
+    assert scraper.cache.get(normalize_url(dropping_url)) is None
+
+
+@pytest.fixture
+def big_pages():
+    """A FakeWebServer whose 200 KB pages take many chunks to read."""
+    with FakeWebServer(page_latency=0.0, page_bytes=200 * 1024) as server:
+        yield server
+
+
+def test_early_stop_is_not_cached(big_pages):
+    scraper = Scraper(use_cache=True, use_corpus=False)
+    url = f"{big_pages.base_url}/page/1"
+    chunks = scraper._stream(url)
+    next(chunks)
+    chunks.close()
+    assert scraper.cache.get(normalize_url(url)) is None
+
+
+def test_page_extracted_early_is_fetched_again(big_pages):
+    scraper = Scraper(use_cache=True, use_corpus=False)
+    scraper.max_content_chars = 200
+    url = f"{big_pages.base_url}/page/3"
+    scraper.scrape_website(url)
+    assert scraper.cache.get(normalize_url(url)) is None
+
+    # A later run that needs the whole page must not get the prefix the first one read
+    requests_before = big_pages.requests
+    scraper.max_content_chars = 100000
+    assert len(scraper.scrape_website(url).content) > 200
+    assert big_pages.requests == requests_before + 1
+
+
+def test_async_early_stop_is_not_cached(big_pages):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            scraper = AsyncScraper(client, use_cache=True, use_corpus=False)
+            scraper.max_content_chars = 200
+            url = f"{big_pages.base_url}/page/4"
+            await scraper.scrape_website(url)
+            return scraper.cache.get(normalize_url(url))
+
+    assert asyncio.run(run()) is None
+
+
+def test_scraped_page_is_served_from_cache(web):
+    # The extractor stops at </main>, but the server has already sent the whole small page
+    scraper = Scraper(use_cache=True, use_corpus=False)
+    url = f"{web.base_url}/page/2"
+    page = scraper.scrape_website(url)
+    requests_before = web.requests
+    assert scraper.scrape_website(url).content == page.content
+    assert web.requests == requests_before
+
+
+def test_corpus_skips_pages_from_the_current_run(web):
+    scraper = Scraper(use_cache=False, use_corpus=True)
+    dedup = PageDeduplicator()
+    assert scraper.search_and_scrape("fake article", dedup)
+
+    # Another run may answer the query from the corpus, but this one has those pages already
+    urls, local_pages = scraper.search_sources("fake article")
+    assert not urls and len(local_pages) == scraper.num_results
+    urls, local_pages = scraper.search_sources("fake article", dedup)
+    assert urls and not local_pages
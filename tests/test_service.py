@@ -0,0 +1,84 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.service import ResearchService, make_server
+
+
+class _Researcher:
+    """Stands in for Researcher in worker processes; the topic "crash" kills the worker."""
+
+    def general_purpose_research(self, topic, run_id=None):
+        if topic == "crash":
+            os._exit(1)
+        return f"{run_id}/report.html"
+
+
+def _researcher_factory():
+    return _Researcher()
+
+
+def _wait(service, job, timeout=30):
+    with service._changed:
+        assert service._changed.wait_for(lambda: job.finished, timeout)
+    return job
+
+
+@pytest.fixture
+def service():
+    service = ResearchService(workers=1, queue_size=2, researcher_factory=_researcher_factory)
+    yield service
+    service.close()
+
+
+def test_service_runs_jobs(service):
+    job = _wait(service, service.submit("topic"))
+    assert job.status == "ok"
+    assert job.report == f"{job.run_id}/report.html"
+
+
+def test_service_recovers_from_a_dead_worker(service):
+    crashed = _wait(service, service.submit("crash"))
+    assert crashed.status == "error"
+
+    job = _wait(service, service.submit("topic"))
+    assert job.status == "ok"
+    stats = service.stats()
+    assert stats["accepting"] and stats["queued"] == 0 and stats["running"] == 0
+    assert stats["pool_restarts"] == 1
+
+
+def test_submit_to_an_unavailable_pool_is_a_503(service):
+    service._executor.shutdown()
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/jobs",
+                                         data=json.dumps({"topic": "topic"}).encode("utf-8"), method="POST")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=10)
+        assert error.value.code == 503
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert service.stats()["queued"] == 0
+    assert not service._jobs
+
+
+def test_missing_report_is_a_410(service):
+    job = _wait(service, service.submit("topic"))
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/jobs/{job.job_id}/report"
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url, timeout=10)
+        assert error.value.code == 410
+        assert "error" in json.loads(error.value.read())
+    finally:
+        server.shutdown()
+        server.server_close()